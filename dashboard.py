@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import time
 from datetime import datetime
-from src.market_data import MarketDataProvider
+from src.market_data import MarketDataProvider, TickerStream
 from src.sentiment_analysis import SentimentAnalyzer
 from src.technical_analysis import TechnicalAnalyzer
 
@@ -60,136 +59,180 @@ st.sidebar.caption("Powered by CCXT & Tokocrypto")
 def get_provider():
     return MarketDataProvider()
 
+@st.cache_resource
+def get_sent_analyzer():
+    return SentimentAnalyzer()
+
+# One WebSocket client shared by every session, pushing tickers in the background
+@st.cache_resource
+def get_ticker_stream():
+    return TickerStream(get_provider())
+
 provider = get_provider()
+sent_analyzer = get_sent_analyzer()
+ticker_stream = get_ticker_stream()
+
+# REST ticker used until the stream delivers, throttled so the fast metrics
+# fragment doesn't poll the exchange every few seconds.
+@st.cache_data(ttl=60)
+def get_rest_ticker(symbol):
+    return provider.get_ticker_info(symbol)
+
+# Indicator results only change when a new candle arrives or the live candle moves,
+# so key the cache on the last candle instead of hashing the whole history.
+@st.cache_data(ttl=300, max_entries=64)
+def compute_metrics(symbol, timeframe, last_ts, last_close, _history_df):
+    analyzer = TechnicalAnalyzer(_history_df)
+    analyzer.add_all_indicators()
+    return analyzer.get_latest_metrics()
+
+# Candlestick figure for the same candles and currency is identical, so cache it
+# on the last candle like the metrics above.
+@st.cache_data(ttl=300, max_entries=64)
+def build_price_chart(symbol, timeframe, last_ts, last_close, rate, _history_df):
+    # Convert the whole OHLC block in one pass, skip it for USD
+    ts = _history_df['timestamp'].to_numpy()
+    ohlc = _history_df[['open', 'high', 'low', 'close']].to_numpy(copy=False)
+    if rate != 1.0:
+        ohlc = ohlc * rate
+
+    fig = go.Figure(data=[go.Candlestick(
+        x=ts,
+        open=ohlc[:, 0],
+        high=ohlc[:, 1],
+        low=ohlc[:, 2],
+        close=ohlc[:, 3],
+        name=symbol
+    )])
+    
+    fig.update_layout(
+        height=500,
+        margin=dict(l=0, r=0, t=0, b=0),
+        xaxis_rangeslider_visible=False,
+        template="plotly_dark",
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+# Live Price Header
+# Reads the streamed ticker from memory, so it can re-render every few seconds
+# without touching the exchange.
+@st.fragment(run_every=5 if auto_refresh else None)
+def render_live_metrics():
+    ticker_stream.watch(symbol)
+    ticker = ticker_stream.get_ticker(symbol) or get_rest_ticker(symbol)
+    
+    # Process Data
+    current_price = ticker['price']
+    high_24h = ticker['high_24h']
+    low_24h = ticker['low_24h']
+    volume = ticker['volume_24h']
+    change_24h = ticker['change_24h']
+    
+    currency_symbol = "$"
+    
+    if show_in_idr:
+        current_price *= idr_rate
+        high_24h *= idr_rate
+        low_24h *= idr_rate
+        # Volume usually in Base asset (Coin), so no conversion needed, 
+        # but if Quote volume (USDT), need conversion. 
+        # Assuming Base Volume from market_data.py
+        currency_symbol = "Rp "
+    
+    # Header & Metrics
+    st.title(f"{symbol} Live Market")
+    
+    if ticker.get('is_mock'):
+        st.warning("⚠️ Connection to Exchange Failed. Showing Simulation Data.")
+    else:
+        st.success("🟢 Live Connection Active")
+    
+    # Metric Columns
+    col1, col2, col3, col4 = st.columns(4)
+    
+    price_spec = ',.0f' if show_in_idr else ',.2f'
+    price_str, high_str, low_str = [f"{currency_symbol}{p:{price_spec}}" for p in (current_price, high_24h, low_24h)]
+    
+    with col1:
+        st.metric("Current Price", price_str, f"{change_24h:+.2f}%")
+        
+    with col2:
+        st.metric("24h High", high_str)
+        
+    with col3:
+        st.metric("24h Low", low_str)
+        
+    with col4:
+        st.metric("24h Volume", f"{volume:,.2f}")
+
+# Dashboard Body
+# Runs as a fragment so auto refresh re-executes only this block every 60s,
+# leaving the session free to handle sidebar changes in the meantime.
+@st.fragment(run_every=60 if auto_refresh else None)
+def render_dashboard():
+    # Fetch Candles (the ticker comes from the live stream above)
+    with st.spinner('Fetching market data...'):
+        history_df = provider.fetch_ohlcv_incremental(symbol, timeframe, limit=100)
+
+    # Nothing to chart or analyze without candles
+    if history_df.empty:
+        st.error("No historical data available.")
+        st.caption(f"Last Update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        return
+
+    last_candle = history_df.iloc[-1]
+
+    # 4. Chart Section
+    st.subheader(f"Price Chart ({timeframe})")
+    
+    rate = idr_rate if show_in_idr else 1.0
+    fig = build_price_chart(symbol, timeframe, last_candle['timestamp'], last_candle['close'], rate, history_df)
+    
+    # Stable key keeps the mounted chart (and the user's zoom) across refreshes,
+    # so an unchanged figure isn't torn down and redrawn client-side
+    st.plotly_chart(fig, use_container_width=True, key="price_chart")
+        
+    # 5. AI Market Sentiment
+    st.markdown("---")
+    st.subheader("🤖 AI Market Sentiment (Social & Technical)")
+    
+    # Analyze
+    metrics = compute_metrics(symbol, timeframe, last_candle['timestamp'], last_candle['close'], history_df)
+    
+    sentiment_results = sent_analyzer.analyze_market_sentiment(metrics)
+    
+    sc1, sc2, sc3, sc4 = st.columns(4)
+    with sc1:
+        st.metric("Global Sentiment (F&G)", 
+                  f"{sentiment_results['global_sentiment']['value']}/100", 
+                  sentiment_results['global_sentiment']['classification'])
+    with sc2:
+         st.metric("Local Sentiment (Vol)", 
+                   f"{sentiment_results['local_sentiment']['score']}/100", 
+                   sentiment_results['local_sentiment']['label'])
+    with sc3:
+         st.metric("Technical Score", 
+                   f"{sentiment_results['technical_sentiment']['score']}/100", 
+                   sentiment_results['technical_sentiment']['label'])
+    with sc4:
+        st.metric("Composite AI Score", 
+                  f"{sentiment_results['composite_score']}/100", 
+                  sentiment_results['composite_label'])
+    
+    st.info(f"💡 **AI Summary:** {sentiment_results['summary']}")
+
+    # Timestamp
+    st.caption(f"Last Update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 # Main Logic
 def main():
-    # Container for dynamic content
-    main_container = st.empty()
-    
-    # Refresh Loop
-    while True:
-        with main_container.container():
-            # 1. Fetch Data
-            with st.spinner('Fetching market data...'):
-                ticker = provider.get_ticker_info(symbol)
-                history_df = provider.fetch_ohlcv(symbol, timeframe, limit=100)
-            
-            # 2. Process Data
-            current_price = ticker['price']
-            high_24h = ticker['high_24h']
-            low_24h = ticker['low_24h']
-            volume = ticker['volume_24h']
-            change_24h = ticker['change_24h']
-            
-            currency_symbol = "$"
-            
-            if show_in_idr:
-                current_price *= idr_rate
-                high_24h *= idr_rate
-                low_24h *= idr_rate
-                # Volume usually in Base asset (Coin), so no conversion needed, 
-                # but if Quote volume (USDT), need conversion. 
-                # Assuming Base Volume from market_data.py
-                currency_symbol = "Rp "
-            
-            # 3. Header & Metrics
-            st.title(f"{symbol} Live Market")
-            
-            if ticker.get('is_mock'):
-                st.warning("⚠️ Connection to Exchange Failed. Showing Simulation Data.")
-            else:
-                st.success("🟢 Live Connection Active")
-            
-            # Metric Columns
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                fmt = f"{currency_symbol}{current_price:,.0f}" if show_in_idr else f"{currency_symbol}{current_price:,.2f}"
-                st.metric("Current Price", fmt, f"{change_24h:+.2f}%")
-                
-            with col2:
-                fmt = f"{currency_symbol}{high_24h:,.0f}" if show_in_idr else f"{currency_symbol}{high_24h:,.2f}"
-                st.metric("24h High", fmt)
-                
-            with col3:
-                fmt = f"{currency_symbol}{low_24h:,.0f}" if show_in_idr else f"{currency_symbol}{low_24h:,.2f}"
-                st.metric("24h Low", fmt)
-                
-            with col4:
-                st.metric("24h Volume", f"{volume:,.2f}")
-
-            # 4. Chart Section
-            st.subheader(f"Price Chart ({timeframe})")
-            
-            if not history_df.empty:
-                # Candle Chart
-                fig = go.Figure(data=[go.Candlestick(
-                    x=history_df['timestamp'],
-                    open=history_df['open'] * (idr_rate if show_in_idr else 1),
-                    high=history_df['high'] * (idr_rate if show_in_idr else 1),
-                    low=history_df['low'] * (idr_rate if show_in_idr else 1),
-                    close=history_df['close'] * (idr_rate if show_in_idr else 1),
-                    name=symbol
-                )])
-                
-                fig.update_layout(
-                    height=500,
-                    margin=dict(l=0, r=0, t=0, b=0),
-                    xaxis_rangeslider_visible=False,
-                    template="plotly_dark",
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.error("No historical data available.")
-                
-            # 5. AI Market Sentiment
-            st.markdown("---")
-            st.subheader("🤖 AI Market Sentiment (Social & Technical)")
-            
-            # Analyze
-            analyzer = TechnicalAnalyzer(history_df)
-            analyzer.add_all_indicators()
-            metrics = analyzer.get_latest_metrics()
-            
-            sent_analyzer = SentimentAnalyzer()
-            sentiment_results = sent_analyzer.analyze_market_sentiment(metrics)
-            
-            sc1, sc2, sc3, sc4 = st.columns(4)
-            with sc1:
-                st.metric("Global Sentiment (F&G)", 
-                          f"{sentiment_results['global_sentiment']['value']}/100", 
-                          sentiment_results['global_sentiment']['classification'])
-            with sc2:
-                 st.metric("Local Sentiment (Vol)", 
-                           f"{sentiment_results['local_sentiment']['score']}/100", 
-                           sentiment_results['local_sentiment']['label'])
-            with sc3:
-                 st.metric("Technical Score", 
-                           f"{sentiment_results['technical_sentiment']['score']}/100", 
-                           sentiment_results['technical_sentiment']['label'])
-            with sc4:
-                st.metric("Composite AI Score", 
-                          f"{sentiment_results['composite_score']}/100", 
-                          sentiment_results['composite_label'])
-            
-            st.info(f"💡 **AI Summary:** {sentiment_results['summary']}")
-
-            # Timestamp
-            st.caption(f"Last Update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # Loop Control
-        if not auto_refresh:
-            if st.button("🔄 Refresh Data"):
-                st.rerun()
-            break
-        else:
-            time.sleep(60)
-            # st.rerun() will be triggered by loop iteration in some streamlit versions, 
-            # but explicit rerun is safer for refreshing
+    render_live_metrics()
+    render_dashboard()
+
+    if not auto_refresh:
+        if st.button("🔄 Refresh Data"):
             st.rerun()
 
 if __name__ == "__main__":
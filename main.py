@@ -3,41 +3,89 @@ import time
 import argparse
 import csv
 import os
+import atexit
+import json
+import numpy as np
 from datetime import datetime
-from colorama import init, Fore, Style
+from colorama import Fore, Style
 from src.market_data import MarketDataProvider
 from src.technical_analysis import TechnicalAnalyzer
 from src.signal_engine import SignalEngine
 from src.sentiment_analysis import SentimentAnalyzer
 from src.execution import TradeExecutor, PaperTradeExecutor
 from src.reporting import TradeReporter
+from src.console import init_console
 
-# Initialize Colorama
-init(autoreset=True)
+# Initialize Colorama (plain text when piped)
+init_console()
+
+# Report section headers (colour codes joined once at import, not per analysis)
+REPORT_HEADERS = {
+    'trend': Fore.CYAN + "\n[1] MARKET TREND ANALYSIS",
+    'levels': Fore.CYAN + "\n[2] KEY LEVELS",
+    'signal': Fore.CYAN + "\n[3] TRADING SIGNAL",
+    'entry': Fore.CYAN + "\n[4] ENTRY SETUP (Risk Management)",
+    'probability': Fore.MAGENTA + "\n[5] AI PROBABILITY ANALYSIS",
+    'sentiment': Fore.CYAN + "\n[6] AI MARKET SENTIMENT (Social/News Proxy)",
+}
 
 # Global Paper Trader Instance (to persist state across loop iterations)
 paper_trader = None
 
+# Global Live Trade Executor (built on the first live trade, reused afterwards)
+live_executor = None
+
+# Global Sentiment Analyzer Instance (built once, reused on every analysis)
+sent_analyzer = None
+
+# Signal log handle (opened once, kept open across loop iterations)
+signal_log_file = None
+signal_log_writer = None
+
+# Signal rows waiting to be written
+pending_signals = []
+
+# Last signal per "symbol|timeframe" ({'signal', 'ts'}), persisted next to the
+# log so de-duplication never has to read the CSV back
+last_signals = None
+SIGNAL_STATE_FILE = '.last_signal.json'
+SIGNAL_FLUSH_EVERY = 10
+SIGNAL_LOG_HEADER = ['Timestamp', 'Symbol', 'Timeframe', 'Signal', 'Price', 'Reason']
+
+def print_section(lines):
+    """Prints report lines with one write, resetting colour per line like autoreset does"""
+    print((Style.RESET_ALL + "\n").join(lines))
+
 def print_header():
     print(Fore.CYAN + Style.BRIGHT + "="*60)
     print(Fore.CYAN + Style.BRIGHT + "       AI TRADE SIGNAL SYSTEM - TOKOCRYPTO INTEGRATION       ")
     print(Fore.CYAN + Style.BRIGHT + "="*60)
 
+def format_small_price(value):
+    return f"{value:.8f}"
+
+def format_standard_price(value):
+    return f"{value:,.2f}"
+
+def get_price_formatter(price):
+    """Picks the price formatter once per symbol (sub-$1 coins need 8 decimals)"""
+    return format_small_price if abs(price) < 1 else format_standard_price
+
 def format_currency(value):
     try:
         v = float(value)
     except (TypeError, ValueError):
         return str(value)
-    if abs(v) < 1:
-        return f"{v:.8f}"
-    return f"{v:,.2f}"
+    return get_price_formatter(v)(v)
+
+# USDT -> IDR rate, read from the environment once at startup
+try:
+    USDT_IDR_RATE = float(os.getenv("USDT_IDR_RATE", "16000"))
+except ValueError:
+    USDT_IDR_RATE = 16000.0
 
 def format_idr(value_usd):
-    try:
-        rate = float(os.getenv("USDT_IDR_RATE", "16000"))
-    except ValueError:
-        rate = 16000.0
-    return f"{value_usd * rate:,.0f}"
+    return f"{value_usd * USDT_IDR_RATE:,.0f}"
 
 def check_paper_auto_close(symbol, current_price):
     global paper_trader
@@ -47,7 +95,7 @@ def check_paper_auto_close(symbol, current_price):
     pos_info = executor.get_position_info(symbol, current_price)
     if not pos_info:
         return
-    levels = executor.get_position_levels(symbol) if hasattr(executor, "get_position_levels") else None
+    levels = executor.get_position_levels(symbol)
     if not levels:
         return
     side = levels.get('side', 'BUY')
@@ -65,77 +113,157 @@ def check_paper_auto_close(symbol, current_price):
     print(Fore.MAGENTA + f"[PAPER TRADE] Auto-close {triggered} hit for {symbol}")
     print(f"  Price: {format_currency(current_price)} | Qty: {qty:.5f}")
     executor.execute_order(symbol, 'sell', qty, current_price)
-    if hasattr(executor, "clear_position_levels"):
-        executor.clear_position_levels(symbol)
-
-def log_signal(symbol, timeframe, signal, price, reason):
-    """Logs the signal to a CSV file with simple de-duplication per candle"""
-    file_path = 'trade_history.csv'
-    file_exists = os.path.isfile(file_path)
-    now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    now_dt = datetime.strptime(now_str, '%Y-%m-%d %H:%M:%S')
-
-    last_row = None
-    if file_exists:
-        try:
-            with open(file_path, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    last_row = row
-        except Exception:
-            last_row = None
+    executor.clear_position_levels(symbol)
+
+def get_signal_log_writer(file_path):
+    """Opens the signal log on first use and returns the shared CSV writer"""
+    global signal_log_file, signal_log_writer
+    if signal_log_writer is None:
+        signal_log_file = open(file_path, 'a', newline='')
+        signal_log_writer = csv.writer(signal_log_file)
+        if os.path.getsize(file_path) == 0:
+            signal_log_writer.writerow(SIGNAL_LOG_HEADER)
+    return signal_log_writer
 
-    if last_row:
+def flush_signals(file_path='trade_history.csv'):
+    """Writes all pending signal rows to the log in one batch"""
+    if not pending_signals:
+        return
+    try:
+        writer = get_signal_log_writer(file_path)
+        writer.writerows(pending_signals)
+        signal_log_file.flush()
+        pending_signals.clear()
+        save_last_signals()
+    except Exception as e:
+        print(Fore.RED + f"Log Error: {e}")
+
+def close_signal_log():
+    """Flushes pending signals and closes the log (runs at exit, including Ctrl+C)"""
+    flush_signals()
+    if signal_log_file is not None:
+        signal_log_file.close()
+
+atexit.register(close_signal_log)
+
+def load_last_signals(file_path='trade_history.csv'):
+    """Loads the de-duplication state, seeding it from the log's last row if there is none yet"""
+    try:
+        with open(SIGNAL_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    state = {}
+    if os.path.isfile(file_path):
         try:
-            last_symbol = last_row.get('Symbol')
-            last_tf = last_row.get('Timeframe')
-            last_signal = last_row.get('Signal')
-            last_ts_str = last_row.get('Timestamp')
-            last_dt = datetime.strptime(last_ts_str, '%Y-%m-%d %H:%M:%S')
-
-            tf_seconds = 0
-            if isinstance(timeframe, str):
-                if timeframe.endswith('h'):
-                    tf_seconds = int(timeframe[:-1]) * 3600
-                elif timeframe.endswith('m'):
-                    tf_seconds = int(timeframe[:-1]) * 60
-                elif timeframe.endswith('d'):
-                    tf_seconds = int(timeframe[:-1]) * 86400
-
-            if (
-                last_symbol == symbol and
-                last_tf == timeframe and
-                last_signal == signal and
-                tf_seconds > 0 and
-                abs((now_dt - last_dt).total_seconds()) < tf_seconds
-            ):
-                return
+            row = read_last_signal_row(file_path)
+            if row:
+                ts = datetime.strptime(row['Timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+                state[f"{row['Symbol']}|{row['Timeframe']}"] = {'signal': row['Signal'], 'ts': ts}
         except Exception:
             pass
-    
+    return state
+
+def save_last_signals():
+    """Writes the de-duplication state atomically (temp file + rename)"""
+    tmp_path = SIGNAL_STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(last_signals, f)
+    os.replace(tmp_path, SIGNAL_STATE_FILE)
+
+def read_last_signal_row(file_path, block_size=4096):
+    """Returns the last row of the signal log as a dict, reading backwards from the end"""
+    with open(file_path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode()]), None)
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        # Pull blocks from the end until a full last line is in hand
+        while pos > 0 and b'\n' not in data.rstrip(b'\r\n'):
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    lines = data.rstrip(b'\r\n').splitlines()
+    if not header or not lines or (pos == 0 and len(lines) < 2):
+        return None # Empty file or header only
+    values = next(csv.reader([lines[-1].decode()]))
+    return dict(zip(header, values))
+
+TIMEFRAME_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400}
+
+def timeframe_seconds(timeframe):
+    """Candle length in seconds for '15m' / '1h' / '1d' style timeframes (0 if unknown)"""
     try:
-        with open(file_path, 'a', newline='') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['Timestamp', 'Symbol', 'Timeframe', 'Signal', 'Price', 'Reason'])
-            writer.writerow([now_str, symbol, timeframe, signal, price, reason])
-    except Exception as e:
-        print(Fore.RED + f"Log Error: {e}")
+        return TIMEFRAME_UNIT_SECONDS[timeframe[-1]] * int(timeframe[:-1])
+    except (KeyError, ValueError, TypeError, IndexError):
+        return 0
+
+def candle_forming(df, tf_seconds):
+    """True if the newest candle is still open, i.e. its close is the live price"""
+    if df.empty or tf_seconds <= 0:
+        return False
+    return time.time() - df['timestamp'].iat[-1].timestamp() < tf_seconds
+
+def log_signal(symbol, timeframe, signal, price, reason, flush_now=False, tf_seconds=None):
+    """
+    Logs the signal to a CSV file with simple de-duplication per candle.
+    Rows are batched and written every SIGNAL_FLUSH_EVERY signals, at exit,
+    or straight away when flush_now is set (live trading).
+    """
+    global last_signals
+    if last_signals is None:
+        last_signals = load_last_signals()
+
+    # Skip a repeat of the same signal for this symbol/timeframe within one candle
+    key = f"{symbol}|{timeframe}"
+    now_dt = datetime.now()
+    now = now_dt.timestamp()
+    if tf_seconds is None:
+        tf_seconds = timeframe_seconds(timeframe)
+    last = last_signals.get(key)
+    if last and last.get('signal') == signal and tf_seconds > 0 and abs(now - last.get('ts', 0)) < tf_seconds:
+        return
+    
+    row = [now_dt.strftime('%Y-%m-%d %H:%M:%S'), symbol, timeframe, signal, price, reason]
+    pending_signals.append(row)
+    last_signals[key] = {'signal': signal, 'ts': now}
+    if flush_now or len(pending_signals) >= SIGNAL_FLUSH_EVERY:
+        flush_signals()
 
-def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amount=10.0):
+def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amount=10.0, snapshot=None, tf_seconds=None):
     print(Fore.WHITE + "\n" + "-"*60)
     print(Fore.YELLOW + f"Analyzing {symbol} on {timeframe} timeframe at {datetime.now().strftime('%H:%M:%S')}...")
+    base_currency, quote_currency = symbol.split('/', 1)
+
+    # Get the Fear & Greed Index (section 6) loading while candles are fetched
+    global sent_analyzer
+    if sent_analyzer is None:
+        sent_analyzer = SentimentAnalyzer()
+    else:
+        sent_analyzer.prefetch()
     
-    # 1. Fetch Data
-    df = market_provider.fetch_ohlcv(symbol, timeframe, limit=300)
+    # 1. Fetch Data (candles and real-time price requested concurrently),
+    # unless run_scan already fetched it alongside the other symbols.
+    # Paper mode skips the ticker while the newest candle is still forming,
+    # since its close already is the live price; live trading always asks.
+    if tf_seconds is None:
+        tf_seconds = timeframe_seconds(timeframe)
+    if snapshot is None:
+        snapshot = market_provider.fetch_snapshot(symbol, timeframe, limit=300, with_ticker=live_mode)
+    ticker_info, df = snapshot
+    if ticker_info is None and not live_mode and not df.empty and not candle_forming(df, tf_seconds):
+        ticker_info = market_provider.get_ticker_info(symbol)
     
-    # Fetch real-time price
+    # Real-time price (ticker_info is None when the ticker was skipped or failed)
+    last_close = float(df['close'].iat[-1]) if not df.empty else 0.0
     try:
-        ticker_info = market_provider.get_ticker_info(symbol)
         current_price = ticker_info['price']
         if current_price <= 0: raise ValueError("Invalid Price")
-    except:
-        current_price = df.iloc[-1]['close'] if not df.empty else 0
+    except (TypeError, KeyError, ValueError):
+        current_price = last_close
 
     if not live_mode:
         check_paper_auto_close(symbol, current_price)
@@ -143,13 +271,18 @@ def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amou
         print(Fore.RED + "Error: No data received from exchange.")
         return None
 
+    # Price levels of one symbol share a magnitude, so choose their format once
+    fmt_price = get_price_formatter(current_price)
+
     # 2. Analyze Data
-    analyzer = TechnicalAnalyzer(df)
-    df_analyzed = analyzer.add_all_indicators()
+    # Hand the candles over as one float64 block (no second DataFrame copy)
+    ohlcv = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+    analyzer = TechnicalAnalyzer.from_ndarray(ohlcv, df['timestamp'].to_numpy())
+    analyzer.add_all_indicators()
     metrics = analyzer.get_latest_metrics()
     
     # 3. Generate Signal
-    engine = SignalEngine(metrics)
+    engine = SignalEngine(metrics, explain=True)
     analysis_result = engine.analyze()
     trade_setup = engine.calculate_entry_exit(
         analysis_result['signal'], 
@@ -158,44 +291,41 @@ def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amou
     )
 
     # 4. Output Results
-    print(Fore.GREEN + Style.BRIGHT + f"\n>>> SIGNAL REPORT FOR [{symbol}] <<<")
-    
-    # Section: Trend Analysis
-    print(Fore.CYAN + "\n[1] MARKET TREND ANALYSIS")
-    print(f"• Trend Direction : {metrics['trend_direction']}")
-    print(f"• Trend Strength  : {metrics['trend_strength']}")
-    
-    # Section: Key Levels
-    print(Fore.CYAN + "\n[2] KEY LEVELS")
-    print(f"• Support (Dynamic)    : {format_currency(metrics['support'])}")
-    print(f"• Resistance (Dynamic) : {format_currency(metrics['resistance'])}")
-    
-    # Section: Signal
+    # Sections 1-4 are static text, so build them up and write them in one go
     sig_color = Fore.GREEN if analysis_result['signal'] == "BUY" else (Fore.RED if analysis_result['signal'] == "SELL" else Fore.YELLOW)
-    print(Fore.CYAN + "\n[3] TRADING SIGNAL")
-    print(f"• Recommendation : {sig_color + Style.BRIGHT + analysis_result['signal']}")
-    print(f"• Reasoning      : {analysis_result['reason']}")
-    
-    # Section: Entry Details
-    print(Fore.CYAN + "\n[4] ENTRY SETUP (Risk Management)")
-    print(f"• Current Price : {format_currency(current_price)}")
+    report = [
+        Fore.GREEN + Style.BRIGHT + f"\n>>> SIGNAL REPORT FOR [{symbol}] <<<",
+        # Section: Trend Analysis
+        REPORT_HEADERS['trend'],
+        f"• Trend Direction : {metrics['trend_direction']}",
+        f"• Trend Strength  : {metrics['trend_strength']}",
+        # Section: Key Levels
+        REPORT_HEADERS['levels'],
+        f"• Support (Dynamic)    : {fmt_price(metrics['support'])}",
+        f"• Resistance (Dynamic) : {fmt_price(metrics['resistance'])}",
+        # Section: Signal
+        REPORT_HEADERS['signal'],
+        f"• Recommendation : {sig_color + Style.BRIGHT + analysis_result['signal']}",
+        f"• Reasoning      : {analysis_result['reason']}",
+        # Section: Entry Details
+        REPORT_HEADERS['entry'],
+        f"• Current Price : {fmt_price(current_price)}",
+    ]
     
     if analysis_result['signal'] != "HOLD":
-        print(f"• Entry Price : {format_currency(trade_setup['entry'])}")
-        print(f"• Stop Loss   : {Fore.RED}{format_currency(trade_setup['sl'])}")
-        print(f"• Take Profit : {Fore.GREEN}{format_currency(trade_setup['tp'])}")
+        report.append(f"• Entry Price : {fmt_price(trade_setup['entry'])}")
+        report.append(f"• Stop Loss   : {Fore.RED}{fmt_price(trade_setup['sl'])}")
+        report.append(f"• Take Profit : {Fore.GREEN}{fmt_price(trade_setup['tp'])}")
         
         # RR Ratio
         risk = abs(trade_setup['entry'] - trade_setup['sl'])
         reward = abs(trade_setup['tp'] - trade_setup['entry'])
         if risk > 0:
             rr_ratio = reward / risk
-            print(f"• R:R Ratio   : 1:{rr_ratio:.2f}")
+            report.append(f"• R:R Ratio   : 1:{rr_ratio:.2f}")
+        print_section(report)
 
         # --- AUTO TRADING EXECUTION ---
-        base_currency = symbol.split('/')[0]
-        quote_currency = symbol.split('/')[1]
-
         min_prob = 60.0
         min_conf = 60.0
         strong_trend_required = ["Strong", "Very Strong"]
@@ -210,7 +340,10 @@ def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amou
         if should_trade:
             if live_mode:
                 print(Fore.MAGENTA + "\n[!] AUTO TRADING ENGAGED (REAL MONEY)")
-                executor = TradeExecutor(market_provider)
+                global live_executor
+                if live_executor is None or live_executor.provider is not market_provider:
+                    live_executor = TradeExecutor(market_provider)
+                executor = live_executor
                 
                 if analysis_result['signal'] == "BUY":
                     position_qty = executor.get_balance(base_currency)
@@ -272,14 +405,13 @@ def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amou
                             qty = round(qty, 4)
                             print(Fore.YELLOW + f"[*] Simulating BUY {qty} {base_currency} (~${trade_amount})...")
                             executor.execute_order(symbol, 'buy', qty, current_price)
-                            if hasattr(executor, "set_position_levels"):
-                                executor.set_position_levels(
-                                    symbol,
-                                    'BUY',
-                                    trade_setup['entry'],
-                                    trade_setup['sl'],
-                                    trade_setup['tp']
-                                )
+                            executor.set_position_levels(
+                                symbol,
+                                'BUY',
+                                trade_setup['entry'],
+                                trade_setup['sl'],
+                                trade_setup['tp']
+                            )
                         else:
                             print(Fore.RED + f"[!] Insufficient Virtual {quote_currency} Balance.")
 
@@ -290,47 +422,63 @@ def run_analysis(symbol, timeframe, market_provider, live_mode=False, trade_amou
                     if balance > 0:
                         print(Fore.YELLOW + f"[*] Simulating SELL {balance} {base_currency}...")
                         executor.execute_order(symbol, 'sell', balance, current_price)
-                        if hasattr(executor, "clear_position_levels"):
-                            executor.clear_position_levels(symbol)
+                        executor.clear_position_levels(symbol)
                     else:
                         print(Fore.RED + f"[!] No Virtual {base_currency} to sell.")
 
         # Log valid signal
-        log_signal(symbol, timeframe, analysis_result['signal'], current_price, analysis_result['reason'])
+        # Live signals go to disk immediately, paper signals are batched
+        log_signal(symbol, timeframe, analysis_result['signal'], current_price, analysis_result['reason'], flush_now=live_mode, tf_seconds=tf_seconds)
     else:
-        print(Fore.YELLOW + "• Status: Waiting for clear signal to generate entry parameters.")
+        report.append(Fore.YELLOW + "• Status: Waiting for clear signal to generate entry parameters.")
+        print_section(report)
     
+    # Sections 5-6 (and the footer) go out together once sentiment is in
+    sentiment_results = sent_analyzer.analyze_market_sentiment(metrics)
+
     # Section: AI Probability
-    print(Fore.MAGENTA + "\n[5] AI PROBABILITY ANALYSIS")
-    print(f"• Probability Score : {analysis_result['probability']:.1f}%")
-    print(f"• Confidence Level  : {analysis_result['confidence']:.1f}%")
-    print("• Influencing Factors:")
-    for factor in analysis_result['factors']:
-        print(f"  - {factor}")
+    report = [
+        REPORT_HEADERS['probability'],
+        f"• Probability Score : {analysis_result['probability']:.1f}%",
+        f"• Confidence Level  : {analysis_result['confidence']:.1f}%",
+        "• Influencing Factors:",
+    ]
+    report.extend(f"  - {factor}" for factor in analysis_result['factors'])
 
     # Section: AI Market Sentiment
-    sent_analyzer = SentimentAnalyzer()
-    sentiment_results = sent_analyzer.analyze_market_sentiment(metrics)
-    
-    print(Fore.CYAN + "\n[6] AI MARKET SENTIMENT (Social/News Proxy)")
-    print(f"• Global Sentiment  : {sentiment_results['global_sentiment']['classification']} ({sentiment_results['global_sentiment']['value']}/100)")
-    print(f"• Local Sentiment   : {sentiment_results['local_sentiment']['label']} ({sentiment_results['local_sentiment']['score']}/100)")
-    print(f"• Technical Score   : {sentiment_results['technical_sentiment']['score']}/100 ({sentiment_results['technical_sentiment']['label']})")
-    print(f"• Composite Score   : {sentiment_results['composite_score']}/100 ({sentiment_results['composite_label']})")
-    print(f"• Summary           : {sentiment_results['summary']}")
-        
-    print(Fore.WHITE + "\n" + "="*60)
+    report += [
+        REPORT_HEADERS['sentiment'],
+        f"• Global Sentiment  : {sentiment_results['global_sentiment']['classification']} ({sentiment_results['global_sentiment']['value']}/100)",
+        f"• Local Sentiment   : {sentiment_results['local_sentiment']['label']} ({sentiment_results['local_sentiment']['score']}/100)",
+        f"• Technical Score   : {sentiment_results['technical_sentiment']['score']}/100 ({sentiment_results['technical_sentiment']['label']})",
+        f"• Composite Score   : {sentiment_results['composite_score']}/100 ({sentiment_results['composite_label']})",
+        f"• Summary           : {sentiment_results['summary']}",
+        Fore.WHITE + "\n" + "="*60,
+    ]
+    print_section(report)
     return analysis_result
 
+def run_scan(symbols, timeframe, market_provider, live_mode=False, trade_amount=10.0, tf_seconds=None):
+    """Analyzes each symbol in turn, with market data for all of them fetched concurrently up front"""
+    snapshots = market_provider.fetch_snapshots(symbols, timeframe, limit=300, with_ticker=live_mode) if len(symbols) > 1 else {}
+    for symbol in symbols:
+        run_analysis(symbol, timeframe, market_provider, live_mode, trade_amount, snapshot=snapshots.get(symbol), tf_seconds=tf_seconds)
+    # Paper trades are queued by the executor; write this cycle's fills out in one go
+    if paper_trader is not None:
+        paper_trader.flush()
+
 def get_args():
     parser = argparse.ArgumentParser(description="AI Trade Signal Bot")
-    parser.add_argument("symbol", nargs="?", help="Trading Pair (e.g. BTC/USDT)")
-    parser.add_argument("timeframe", nargs="?", help="Timeframe (e.g. 1h, 4h)")
+    parser.add_argument("symbol", nargs="?", default="BTC/USDT", help="Trading Pair, or comma-separated pairs (default: BTC/USDT)")
+    parser.add_argument("timeframe", nargs="?", default="1h", help="Timeframe (e.g. 1h, 4h; default: 1h)")
+    parser.add_argument("--interactive", action="store_true", help="Prompt for coin and timeframe")
     parser.add_argument("--loop", action="store_true", help="Run in continuous monitoring mode")
     parser.add_argument("--interval", type=int, default=60, help="Refresh interval in seconds (default: 60)")
+    parser.add_argument("--countdown", action="store_true", help="Show a per-second countdown between checks in loop mode")
     parser.add_argument("--live", action="store_true", help="ENABLE REAL TRADING (Use with caution!)")
     parser.add_argument("--usdt", type=float, default=10.0, help="USDT Amount to Buy per trade (Default: 10 USDT)")
     parser.add_argument("--history", action="store_true", help="Show Paper Trade History Analysis")
+    parser.add_argument("--summary", action="store_true", help="With --history, skip the per-trade table and show only positions and totals")
     return parser.parse_args()
 
 def main():
@@ -339,21 +487,20 @@ def main():
 
     if args.history:
         reporter = TradeReporter()
-        reporter.generate_report()
+        reporter.generate_report(show_trades=not args.summary)
         sys.exit(0)
     
-    # Interactive Input if args missing
+    # Defaults come from argparse; prompting is opt-in so headless runs never block
     symbol = args.symbol
     timeframe = args.timeframe
     
-    if not symbol:
+    if args.interactive:
         print(Fore.YELLOW + "\n[INPUT CONFIGURATION]")
-        symbol = input("Enter Coin/Asset (e.g., BTC/USDT): ").strip().upper()
-        if not symbol: symbol = "BTC/USDT"
-        
-    if not timeframe:
-        timeframe = input("Enter Timeframe (e.g., 1h, 4h, 1d): ").strip().lower()
-        if not timeframe: timeframe = "1h"
+        symbol = input(f"Enter Coin/Asset (e.g., BTC/USDT or BTC/USDT,ETH/USDT) [{symbol}]: ").strip().upper() or symbol
+        timeframe = input(f"Enter Timeframe (e.g., 1h, 4h, 1d) [{timeframe}]: ").strip().lower() or timeframe
+
+    symbols = [s.strip() for s in symbol.split(',') if s.strip()]
+    tf_seconds = timeframe_seconds(timeframe) # Fixed for the whole session
 
     print(Fore.YELLOW + f"Connecting to Tokocrypto via CCXT...")
     market = MarketDataProvider()
@@ -364,21 +511,32 @@ def main():
         if args.live:
              print(Fore.MAGENTA + f"[!] Trade Amount: ${args.usdt}")
 
+        # Padded to the widest value so shorter numbers overwrite the previous tick
+        countdown_tmpl = "\rWaiting %" + str(len(str(args.interval))) + "ds for next check..."
+
         try:
             while True:
-                run_analysis(symbol, timeframe, market, args.live, args.usdt)
+                run_scan(symbols, timeframe, market, args.live, args.usdt, tf_seconds)
                 
-                # Countdown
-                for i in range(args.interval, 0, -1):
-                    sys.stdout.write(f"\rWaiting {i}s for next check...")
-                    sys.stdout.flush()
-                    time.sleep(1)
-                sys.stdout.write("\r" + " "*30 + "\r") # Clear line
+                # One sleep per cycle by default; the per-second countdown is opt-in
+                # and the status line is only drawn on an interactive terminal
+                if not sys.stdout.isatty():
+                    time.sleep(args.interval)
+                else:
+                    if args.countdown:
+                        deadline = time.monotonic() + args.interval
+                        while (remaining := deadline - time.monotonic()) > 0:
+                            print(countdown_tmpl % (int(remaining) + 1), end="", flush=True)
+                            time.sleep(min(1.0, remaining))
+                    else:
+                        print(countdown_tmpl % args.interval, end="", flush=True)
+                        time.sleep(args.interval)
+                    sys.stdout.write("\r" + " "*30 + "\r") # Clear line
                 
         except KeyboardInterrupt:
             print(Fore.RED + "\nStopped by user.")
     else:
-        run_analysis(symbol, timeframe, market, args.live, args.usdt)
+        run_scan(symbols, timeframe, market, args.live, args.usdt, tf_seconds)
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,12 @@
 import sys
-from colorama import init, Fore, Style
+from colorama import Fore, Style
 from src.market_data import MarketDataProvider
-from src.backtester import Backtester
+from src.backtester import Backtester, warmup_jit
+from src.console import init_console
 import pandas as pd
 
-# Initialize Colorama
-init(autoreset=True)
+# Initialize Colorama (plain text when piped)
+init_console()
 
 def print_header():
     print(Fore.MAGENTA + Style.BRIGHT + "="*60)
@@ -39,6 +40,7 @@ def main():
 
     # 2. Run Backtest
     print(Fore.CYAN + "\n[2] Running Backtest Simulation...")
+    warmup_jit() # Pay JIT compilation up front, not inside the simulation
     backtester = Backtester(df, initial_capital=initial_capital)
     
     try:
@@ -65,7 +67,7 @@ def main():
     print(f"• Profit Factor   : {results['profit_factor']:.2f}")
     
     # Benchmark Comparison
-    benchmark_final = results['benchmark_curve'].iloc[-1]['equity']
+    benchmark_final = results['benchmark_final_equity']
     benchmark_roi = ((benchmark_final - initial_capital) / initial_capital) * 100
     print(Fore.MAGENTA + "\n[BENCHMARK COMPARISON (Buy & Hold)]")
     print(f"• Benchmark ROI   : {benchmark_roi:+.2f}%")
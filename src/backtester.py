@@ -2,417 +2,496 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from src.technical_analysis import TechnicalAnalyzer
-from src.signal_engine import SignalEngine
+from src.signal_engine import (
+    analyze_bar, SIGNAL_BUY, SIGNAL_SELL, TREND_BULLISH, TREND_BEARISH, STRENGTH_WEAK, STRENGTH_STRONG
+)
+from src.jit import njit
 import matplotlib.dates as mdates
+from concurrent.futures import ProcessPoolExecutor
+
+# Columns the simulation loop reads per bar
+BAR_COLUMNS = (
+    'open', 'high', 'low', 'close', 'volume', 'RSI', 'MACDh_12_26_9', 'EMA_50', 'EMA_200',
+    'ADX_14', 'ATR', 'Support_Dynamic', 'Resistance_Dynamic', 'VOL_SMA_20'
+)
+
+# Exit reason codes returned by the exit kernels
+EXIT_SL = 1
+EXIT_TP = 2
+
+@njit(cache=True)
+def pick_exit(open_, sl, tp, hit_sl, hit_tp):
+    """
+    Resolves which level closes the trade as (exit_price, reason), (0.0, 0) if neither.
+    Written as selects rather than an if/elif chain so the compiled kernel doesn't branch.
+    """
+    # Both touched on one candle: whichever level sits nearer the open is taken as hit first
+    nearer_sl = abs(open_ - sl) < abs(open_ - tp)
+    take_sl = hit_sl & ((not hit_tp) | nearer_sl)
+    exit_price = sl if take_sl else tp
+    reason = EXIT_SL if take_sl else EXIT_TP
+    hit = hit_sl | hit_tp
+    return (exit_price if hit else 0.0), (reason if hit else 0)
+
+@njit(cache=True)
+def long_exit(open_, high, low, entry, initial_sl, sl, tp):
+    """
+    SL/TP check for a long position on one candle.
+    Returns (sl, exit_price, reason); exit_price is 0.0 when nothing is hit.
+    """
+    # --- TRAILING STOP LOGIC ---
+    # Calculate Risk (R)
+    risk = entry - initial_sl
+    if risk > 0:
+        # 1. Break Even Trigger (at 2.5R Profit)
+        # We give it plenty of room to breathe.
+        if high >= entry + (2.5 * risk):
+            new_sl = entry + (0.5 * risk) # Secure 0.5R profit
+            if new_sl > sl:
+                sl = new_sl
+
+    # Note: No EMA50 Exit (Whipsaw prone)
+
+    hit_sl = low <= sl
+    hit_tp = high >= tp
+    exit_price, reason = pick_exit(open_, sl, tp, hit_sl, hit_tp)
+    return sl, exit_price, reason
+
+@njit(cache=True)
+def short_exit(open_, high, low, entry, initial_sl, sl, tp):
+    """
+    SL/TP check for a short position on one candle.
+    Returns (sl, exit_price, reason); exit_price is 0.0 when nothing is hit.
+    """
+    # --- TRAILING STOP LOGIC ---
+    # Calculate Risk (R)
+    risk = initial_sl - entry
+    if risk > 0:
+        # 1. Break Even Trigger (at 2.5R Profit)
+        if low <= entry - (2.5 * risk):
+            new_sl = entry - (0.5 * risk)
+            if new_sl < sl:
+                sl = new_sl
+
+    # For Short: SL is higher (hit by High), TP is lower (hit by Low)
+    hit_sl = high >= sl
+    hit_tp = low <= tp
+    exit_price, reason = pick_exit(open_, sl, tp, hit_sl, hit_tp)
+    return sl, exit_price, reason
+
+# Side codes for signals, positions and trades
+SIDE_BUY = SIGNAL_BUY
+SIDE_SELL = SIGNAL_SELL
+
+# Fields recorded per closed trade
+TRADE_COLUMNS = ('entry_time', 'exit_time', 'entry_price', 'exit_price', 'type', 'size', 'pnl', 'pnl_pct', 'reason')
+
+@njit(cache=True)
+def compute_signals(close, rsi, macd_hist, ema_50, ema_200, atr, adx, support, resistance,
+                    volume, vol_sma, start_index):
+    """Signal side code and entry SL/TP for every bar from start_index"""
+    n = len(close)
+    signal = np.zeros(n, dtype=np.int64)
+    signal_sl = np.zeros(n)
+    signal_tp = np.zeros(n)
+    for i in range(start_index, n):
+        # Reconstruct trend direction logic (simplified from TechnicalAnalyzer.get_latest_metrics)
+        trend_dir = TREND_BULLISH if ema_50[i] > ema_200[i] else TREND_BEARISH
+        trend_str = STRENGTH_STRONG if adx[i] > 25 else STRENGTH_WEAK
+        signal[i], signal_sl[i], signal_tp[i] = analyze_bar(
+            close[i], rsi[i], macd_hist[i], ema_50[i], ema_200[i], atr[i], trend_dir, trend_str,
+            support[i], resistance[i], volume[i], vol_sma[i]
+        )
+    return signal, signal_sl, signal_tp
+
+@njit(cache=True)
+def simulate(open_, high, low, close, signal, signal_sl, signal_tp, start_index,
+             initial_capital, fee_pct, slippage_pct):
+    """
+    Bar-by-bar trade simulation from start_index.
+    signal holds SIDE_BUY/SIDE_SELL (0 = hold) per bar with the SL/TP the signal
+    engine set for it. Returns (equity, trades, balance, position) where trades is
+    a tuple of per-trade arrays and position is the still-open (side, entry, size,
+    sl, initial_sl, tp, entry_bar), side 0 when flat.
+    """
+    n = len(close)
+    equity = np.empty(n - start_index)
+
+    # A trade needs at least one bar, so this bounds the trade count
+    max_trades = n - start_index
+    trade_entry_bar = np.empty(max_trades, dtype=np.int64)
+    trade_exit_bar = np.empty(max_trades, dtype=np.int64)
+    trade_side = np.empty(max_trades, dtype=np.int64)
+    trade_reason = np.empty(max_trades, dtype=np.int64)
+    trade_entry_price = np.empty(max_trades)
+    trade_exit_price = np.empty(max_trades)
+    trade_size = np.empty(max_trades)
+    trade_pnl = np.empty(max_trades)
+    trade_pnl_pct = np.empty(max_trades)
+    n_trades = 0
+
+    balance = initial_capital
+    side = 0
+    entry = 0.0
+    size = 0.0
+    sl = 0.0
+    initial_sl = 0.0
+    tp = 0.0
+    entry_bar = 0
+
+    for i in range(start_index, n):
+        # Ruined and flat: no entry can fire again, so equity stays at the balance
+        if side == 0 and balance <= 0:
+            equity[i - start_index:] = balance
+            break
+
+        # Record Equity
+        if side == SIDE_BUY:
+            # Long: Equity = Cash + Asset Value
+            equity[i - start_index] = balance + size * close[i]
+        elif side == SIDE_SELL:
+            # Short: Equity = Cash + Margin + PnL
+            # Cash (Balance) has Margin deducted.
+            # Equity = Balance + 2*EntryVal - CurrentVal
+            equity[i - start_index] = balance + (2 * (size * entry)) - size * close[i]
+        else:
+            equity[i - start_index] = balance
+
+        # Check for Exit (SL/TP)
+        if side != 0:
+            if side == SIDE_BUY:
+                sl, exit_price, reason = long_exit(open_[i], high[i], low[i], entry, initial_sl, sl, tp)
+            else:
+                sl, exit_price, reason = short_exit(open_[i], high[i], low[i], entry, initial_sl, sl, tp)
+
+            if exit_price:
+                if side == SIDE_BUY:
+                    # Apply slippage (sell lower)
+                    price = exit_price * (1 - slippage_pct)
+                    revenue = price * size
+                    fee = revenue * fee_pct
+                    balance += revenue - fee
+                    gross_pnl = (price - entry) * size
+                else:
+                    # Closing a SHORT position (Buying back), slippage buys higher
+                    price = exit_price * (1 + slippage_pct)
+                    cost = price * size
+                    fee = cost * fee_pct
+                    # Balance += EntryVal (Margin Release) + (EntryVal - Cost - Fee) (PnL)
+                    balance += (2 * (entry * size)) - cost - fee
+                    gross_pnl = (entry - price) * size
+
+                total_fees = (entry * size * fee_pct) + (price * size * fee_pct)
+                net_pnl = gross_pnl - total_fees
+
+                trade_entry_bar[n_trades] = entry_bar
+                trade_exit_bar[n_trades] = i
+                trade_side[n_trades] = side
+                trade_reason[n_trades] = reason
+                trade_entry_price[n_trades] = entry
+                trade_exit_price[n_trades] = price
+                trade_size[n_trades] = size
+                trade_pnl[n_trades] = net_pnl
+                trade_pnl_pct[n_trades] = (net_pnl / (entry * size)) * 100
+                n_trades += 1
+                side = 0
+
+        # Check for Entry (if no position)
+        if side == 0 and signal[i] != 0 and balance > 0:
+            price = close[i]
+
+            # Risk Management: Risk 2% of capital
+            risk_amount = balance * 0.02
+            price_risk = abs(price - signal_sl[i])
+            if price_risk == 0:
+                continue
+
+            position_size = risk_amount / price_risk
+
+            # Ensure we can afford it (assuming 1x leverage for simplicity, though shorts usually need margin)
+            # For simulation, we assume we can short with cash balance as collateral
+            max_cost = balance / (1 + fee_pct)
+            if position_size * price > max_cost:
+                position_size = max_cost / price
+
+            # Safety check for invalid size
+            if position_size <= 0:
+                continue
+
+            # Apply slippage (buy higher, sell lower)
+            if signal[i] == SIDE_BUY:
+                fill = price * (1 + slippage_pct)
+            else:
+                fill = price * (1 - slippage_pct)
+
+            # Shorts lock the full value as margin (100% for simplicity)
+            cost = fill * position_size
+            total_cost = cost + cost * fee_pct
+            if total_cost > balance:
+                continue # Cannot afford
+
+            balance -= total_cost
+            side = signal[i]
+            entry = fill
+            size = position_size
+            sl = signal_sl[i]
+            initial_sl = sl # Added for Trailing Stop
+            tp = signal_tp[i]
+            entry_bar = i
+
+    trades = (trade_entry_bar[:n_trades], trade_exit_bar[:n_trades], trade_side[:n_trades],
+              trade_reason[:n_trades], trade_entry_price[:n_trades], trade_exit_price[:n_trades],
+              trade_size[:n_trades], trade_pnl[:n_trades], trade_pnl_pct[:n_trades])
+    position = (side, entry, size, sl, initial_sl, tp, entry_bar)
+    return equity, trades, balance, position
+
+@njit(cache=True)
+def max_drawdown(equity):
+    """Deepest fall from the running peak as a fraction (<= 0), in one pass"""
+    peak = equity[0]
+    mdd = 0.0
+    for i in range(1, equity.size):
+        if equity[i] > peak:
+            peak = equity[i]
+        else:
+            dd = (equity[i] - peak) / peak
+            if dd < mdd:
+                mdd = dd
+    return mdd
+
+@njit(cache=True)
+def drawdown_curve(equity):
+    """Running peak and drawdown per bar, filled in one pass"""
+    peak = np.empty(equity.size)
+    drawdown = np.empty(equity.size)
+    running = equity[0]
+    for i in range(equity.size):
+        if equity[i] > running:
+            running = equity[i]
+        peak[i] = running
+        drawdown[i] = (equity[i] - running) / running
+    return peak, drawdown
+
+def warmup_jit(bar_dtype=np.float64):
+    """Compiles (or loads from cache) the simulation kernels for bar_dtype before a timed run"""
+    bars = np.ones(3, dtype=bar_dtype)
+    signal, signal_sl, signal_tp = compute_signals(bars, bars, bars, bars, bars, bars, bars, bars, bars, bars, bars, 0)
+    equity = simulate(bars, bars, bars, bars, signal, signal_sl, signal_tp, 0, 1.0, 0.001, 0.0005)[0]
+    max_drawdown(equity)
+    drawdown_curve(equity)
+
+# Indicator frame shared by a run_grid worker process, sent once per worker
+_grid_df = None
+
+def _init_grid_worker(df):
+    global _grid_df
+    _grid_df = df
+
+def _run_grid_one(params):
+    return Backtester(_grid_df, **params).run()
 
 class Backtester:
-    def __init__(self, df, initial_capital=10000, fee_pct=0.001, slippage_pct=0.0005):
+    # Figure reused by every plot_results call (creating one per run is slow in sweeps)
+    _fig = None
+    _axes = None
+
+    def __init__(self, df, initial_capital=10000, fee_pct=0.001, slippage_pct=0.0005, bar_dtype=np.float64,
+                 indicator_cache_dir=None):
         self.df = df.copy()
         self.initial_capital = initial_capital
         self.fee_pct = fee_pct
         self.slippage_pct = slippage_pct
+        # Precision of the price/indicator arrays fed to the kernels. np.float32 halves their
+        # memory traffic on long runs at the cost of exact results; account totals stay float64.
+        self.bar_dtype = bar_dtype
+        # Where computed indicators are kept between runs over the same candles (None to disable)
+        self.indicator_cache_dir = indicator_cache_dir
         
         # State
         self.balance = initial_capital
         self.position = None # None or {'type': 'BUY'/'SELL', 'entry_price': x, 'size': x, 'sl': x, 'tp': x}
-        self.trades = []
-        self.equity_curve = []
-        self.benchmark_curve = []
+        # Closed trades stored column-wise; see the trades property for a DataFrame
+        self.trade_cols = {c: np.empty(0) for c in TRADE_COLUMNS}
+        # Per-bar curves as plain arrays; DataFrames are only built on request
+        self.timestamps = None
+        self.equity = None
+        self.benchmark = None
 
     def run(self):
         """
         Runs the backtest simulation.
         """
-        # 1. Pre-calculate indicators
-        analyzer = TechnicalAnalyzer(self.df)
-        self.df = analyzer.add_all_indicators()
+        # Start from index 200 to allow for EMA200 calculation; checked before the
+        # indicators, which leave some columns out on frames this short
+        start_index = 200
+        if len(self.df) < start_index + 10:
+            raise Exception("Not enough data points for backtesting (min 250)")
+
+        # 1. Pre-calculate indicators (unless the frame already carries them, e.g. from run_grid)
+        if not set(BAR_COLUMNS).issubset(self.df.columns):
+            analyzer = TechnicalAnalyzer(self.df)
+            self.df = analyzer.add_all_indicators(self.indicator_cache_dir)
+
+        # Hoist the columns the loop reads into plain arrays (no Series per bar)
+        self._cols = {c: self.df[c].to_numpy(dtype=self.bar_dtype) for c in BAR_COLUMNS}
         
         # Initialize benchmark (Buy & Hold)
-        initial_price = self.df.iloc[0]['close']
+        close = np.asarray(self._cols['close'], dtype=np.float64)
+        initial_price = close[0]
         benchmark_shares = self.initial_capital / initial_price
         
         print("Running Backtest Simulation...")
         
         # 2. Iterate through candles
-        # Start from index 200 to allow for EMA200 calculation
-        start_index = 200
-        if len(self.df) < start_index + 10:
-            raise Exception("Not enough data points for backtesting (min 250)")
+        # Signals only depend on the bar, so they're evaluated up front and the
+        # path-dependent part runs in the compiled kernel
+        cols = self._cols
+        signal, signal_sl, signal_tp = compute_signals(
+            cols['close'], cols['RSI'], cols['MACDh_12_26_9'], cols['EMA_50'], cols['EMA_200'],
+            cols['ATR'], cols['ADX_14'], cols['Support_Dynamic'], cols['Resistance_Dynamic'],
+            cols['volume'], cols['VOL_SMA_20'], start_index
+        )
+        self.equity, trades, self.balance, position = simulate(
+            cols['open'], cols['high'], cols['low'], cols['close'],
+            signal, signal_sl, signal_tp, start_index,
+            float(self.initial_capital), float(self.fee_pct), float(self.slippage_pct)
+        )
+        timestamps = self.df['timestamp'].array
+        self.trade_cols = self._build_trades(trades, timestamps)
+        self.position = self._build_position(position, timestamps)
 
-        for i in range(start_index, len(self.df)):
-            current_candle = self.df.iloc[i]
-            prev_candle = self.df.iloc[i-1]
-            
-            # Record Equity
-            current_equity = self.balance
-            if self.position:
-                if self.position['type'] == 'BUY':
-                    # Long: Equity = Cash + Asset Value
-                    current_value = self.position['size'] * current_candle['close']
-                    current_equity = self.balance + current_value
-                elif self.position['type'] == 'SELL':
-                    # Short: Equity = Cash + Margin + PnL
-                    # Cash (Balance) has Margin deducted.
-                    # Equity = Balance + 2*EntryVal - CurrentVal
-                    entry_val = self.position['size'] * self.position['entry_price']
-                    current_val = self.position['size'] * current_candle['close']
-                    current_equity = self.balance + (2 * entry_val) - current_val
-            
-            self.equity_curve.append({
-                'timestamp': current_candle['timestamp'],
-                'equity': current_equity
-            })
-            
-            # Record Benchmark
-            self.benchmark_curve.append({
-                'timestamp': current_candle['timestamp'],
-                'equity': benchmark_shares * current_candle['close']
-            })
-
-            # Check for Exit (SL/TP)
-            if self.position:
-                self._check_exit(current_candle)
-            
-            # Check for Entry (if no position)
-            if not self.position:
-                self._check_entry(i)
+        self.timestamps = self.df['timestamp'].to_numpy()[start_index:]
+        self.benchmark = benchmark_shares * close[start_index:]
                 
         return self._calculate_metrics()
 
-    def _check_exit(self, candle):
-        # Logic for BUY positions
-        if self.position['type'] == 'BUY':
-            sl = self.position['sl']
-            tp = self.position['tp']
-            entry = self.position['entry_price']
-            
-            # --- TRAILING STOP LOGIC ---
-            # Calculate Risk (R)
-            risk = entry - self.position['initial_sl'] 
-            if risk > 0:
-                # 1. Break Even Trigger (at 2.5R Profit)
-                # We give it plenty of room to breathe.
-                if candle['high'] >= entry + (2.5 * risk):
-                    new_sl = entry + (0.5 * risk) # Secure 0.5R profit
-                    if new_sl > sl:
-                        self.position['sl'] = new_sl
-                        sl = new_sl
-            
-            # Note: No EMA50 Exit (Whipsaw prone)
-
-            hit_sl = candle['low'] <= sl
-            hit_tp = candle['high'] >= tp
-            
-            exit_price = None
-            exit_reason = None
-            
-            if hit_sl and hit_tp:
-                 if abs(candle['open'] - sl) < abs(candle['open'] - tp):
-                    exit_price = sl
-                    exit_reason = "SL"
-                 else:
-                    exit_price = tp
-                    exit_reason = "TP"
-            elif hit_sl:
-                exit_price = sl
-                exit_reason = "SL"
-            elif hit_tp:
-                exit_price = tp
-                exit_reason = "TP"
-                
-            if exit_price:
-                self._execute_sell(exit_price, candle['timestamp'], exit_reason)
-
-        # Logic for SELL positions
-        elif self.position['type'] == 'SELL':
-            sl = self.position['sl']
-            tp = self.position['tp']
-            entry = self.position['entry_price']
-
-            # --- TRAILING STOP LOGIC ---
-            # Calculate Risk (R)
-            risk = self.position['initial_sl'] - entry
-            if risk > 0:
-                # 1. Break Even Trigger (at 2.5R Profit)
-                if candle['low'] <= entry - (2.5 * risk):
-                    new_sl = entry - (0.5 * risk)
-                    if new_sl < sl:
-                        self.position['sl'] = new_sl
-                        sl = new_sl
-
-            # For Short: SL is higher (hit by High), TP is lower (hit by Low)
-            hit_sl = candle['high'] >= sl
-            hit_tp = candle['low'] <= tp
-            
-            exit_price = None
-            exit_reason = None
-            
-            if hit_sl and hit_tp:
-                if abs(candle['open'] - sl) < abs(candle['open'] - tp):
-                    exit_price = sl
-                    exit_reason = "SL"
-                else:
-                    exit_price = tp
-                    exit_reason = "TP"
-            elif hit_sl:
-                exit_price = sl
-                exit_reason = "SL"
-            elif hit_tp:
-                exit_price = tp
-                exit_reason = "TP"
-                
-            if exit_price:
-                self._execute_cover(exit_price, candle['timestamp'], exit_reason)
-
-    def _check_entry(self, index):
-        # Prepare metrics for SignalEngine
-        # We need to construct the dictionary that SignalEngine expects
-        row = self.df.iloc[index]
-        
-        # Reconstruct trend direction logic (simplified from TechnicalAnalyzer.get_latest_metrics)
-        trend_direction = "Sideways"
-        if row['EMA_50'] > row['EMA_200']: trend_direction = "Bullish"
-        else: trend_direction = "Bearish"
-            
-        trend_strength = "Weak"
-        if row['ADX_14'] > 25: trend_strength = "Strong"
-        
-        metrics = {
-            'close': row['close'],
-            'rsi': row['RSI'],
-            'macd': row['MACD_12_26_9'],
-            'macd_signal': row['MACDs_12_26_9'],
-            'macd_hist': row['MACDh_12_26_9'],
-            'ema_50': row['EMA_50'],
-            'ema_200': row['EMA_200'],
-            'atr': row['ATR'],
-            'trend_direction': trend_direction,
-            'trend_strength': trend_strength,
-            'support': row['Support_Dynamic'],
-            'resistance': row['Resistance_Dynamic'],
-            'volume': row['volume'],
-            'vol_sma': row['VOL_SMA_20']
-        }
-        
-        engine = SignalEngine(metrics)
-        analysis = engine.analyze()
-        
-        if analysis['signal'] == "BUY":
-            trade_setup = engine.calculate_entry_exit("BUY", row['close'], row['ATR'])
-            self._position_size_and_execute(trade_setup, row, "BUY")
-            
-        elif analysis['signal'] == "SELL":
-            trade_setup = engine.calculate_entry_exit("SELL", row['close'], row['ATR'])
-            self._position_size_and_execute(trade_setup, row, "SELL")
-
-    def _position_size_and_execute(self, trade_setup, row, direction):
-        if self.balance <= 0:
-            return
-
-        # Risk Management: Risk 2% of capital
-        risk_amount = self.balance * 0.02
-        price_risk = abs(trade_setup['entry'] - trade_setup['sl'])
-        
-        if price_risk == 0: return
-
-        position_size = risk_amount / price_risk
-        
-        # Ensure we can afford it (assuming 1x leverage for simplicity, though shorts usually need margin)
-        # For simulation, we assume we can short with cash balance as collateral
-        max_cost = self.balance / (1 + self.fee_pct)
-        cost = position_size * row['close']
-        
-        if cost > max_cost:
-            position_size = max_cost / row['close']
-            
-        # Safety check for invalid size
-        if position_size <= 0:
-            return
-        
-        if direction == "BUY":
-            self._execute_buy(row['close'], position_size, trade_setup['sl'], trade_setup['tp'], row['timestamp'])
-        else:
-            self._execute_short(row['close'], position_size, trade_setup['sl'], trade_setup['tp'], row['timestamp'])
+    @staticmethod
+    def run_grid(df, param_grid, n_jobs=None):
+        """
+        Backtests the same candles once per parameter set (Backtester keyword
+        arguments, e.g. {'fee_pct': 0.002}), spreading the runs over n_jobs
+        processes; each run itself stays sequential. n_jobs=None (or below 1,
+        e.g. -1) uses every core. Returns the results in grid order. Call it
+        from under `if __name__ == "__main__":`.
+        """
+        if n_jobs is not None and n_jobs < 1:
+            n_jobs = None
+        # Indicators don't depend on the parameters, so compute them once for all runs
+        df = TechnicalAnalyzer(df).add_all_indicators()
+        param_grid = list(param_grid)
+        if n_jobs == 1:
+            _init_grid_worker(df)
+            return [_run_grid_one(params) for params in param_grid]
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_grid_worker, initargs=(df,)) as pool:
+            return list(pool.map(_run_grid_one, param_grid))
 
-    def _execute_buy(self, price, size, sl, tp, timestamp):
-        # Apply slippage
-        price = price * (1 + self.slippage_pct)
-        
-        # Apply fees
-        cost = price * size
-        fee = cost * self.fee_pct
-        total_cost = cost + fee
-        
-        if total_cost > self.balance:
-            return # Cannot afford
-            
-        self.balance -= total_cost
-        self.position = {
-            'type': 'BUY',
-            'entry_price': price,
+    def _build_trades(self, trades, timestamps):
+        """Turns the kernel's trade arrays into trade columns"""
+        entry_bar, exit_bar, side, reason, entry_price, exit_price, size, pnl, pnl_pct = trades
+        return {
+            'entry_time': timestamps[entry_bar],
+            'exit_time': timestamps[exit_bar],
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'type': np.where(side == SIDE_BUY, 'BUY', 'SELL'),
             'size': size,
-            'sl': sl,
-            'initial_sl': sl, # Added for Trailing Stop
-            'tp': tp,
-            'entry_time': timestamp
+            'pnl': pnl,
+            'pnl_pct': pnl_pct,
+            'reason': np.where(reason == EXIT_SL, 'SL', 'TP')
         }
-        # print(f"[BUY] Price: {price:.2f}, Size: {size:.4f}, Bal: {self.balance:.2f}")
 
-    def _execute_short(self, price, size, sl, tp, timestamp):
-        # Apply slippage (sell lower)
-        price = price * (1 - self.slippage_pct)
-        
-        # Initial Margin Requirement (100% for simplicity)
-        # We "sell" so we get cash, but we lock it as collateral + margin
-        # Simplified model: We deduct the full value from balance as "locked margin"
-        
-        cost = price * size
-        fee = cost * self.fee_pct
-        
-        required_margin = cost + fee
-        
-        if required_margin > self.balance:
-            return
-            
-        self.balance -= required_margin
-        self.position = {
-            'type': 'SELL',
-            'entry_price': price,
+    @property
+    def trades(self):
+        """Closed trades as a DataFrame, one row per trade"""
+        return pd.DataFrame(self.trade_cols, columns=list(TRADE_COLUMNS))
+
+    def _build_position(self, position, timestamps):
+        """Turns the kernel's open position tuple back into the position dict"""
+        side, entry_price, size, sl, initial_sl, tp, entry_bar = position
+        if side == 0:
+            return None
+        return {
+            'type': 'BUY' if side == SIDE_BUY else 'SELL',
+            'entry_price': entry_price,
             'size': size,
             'sl': sl,
-            'initial_sl': sl, # Added for Trailing Stop
+            'initial_sl': initial_sl,
             'tp': tp,
-            'entry_time': timestamp
+            'entry_time': timestamps[entry_bar]
         }
-        # print(f"[SHORT] Price: {price:.2f}, Size: {size:.4f}, Bal: {self.balance:.2f}")
 
-    def _execute_sell(self, price, timestamp, reason):
-        # Apply slippage (sell lower)
-        price = price * (1 - self.slippage_pct)
-        
-        size = self.position['size']
-        revenue = price * size
-        fee = revenue * self.fee_pct
-        net_revenue = revenue - fee
-        
-        self.balance += net_revenue
-        
-        # Profit Calculation
-        entry_price = self.position['entry_price']
-        gross_pnl = (price - entry_price) * size
-        total_fees = (entry_price * size * self.fee_pct) + (price * size * self.fee_pct)
-        net_pnl = gross_pnl - total_fees
-        
-        pnl_pct = (net_pnl / (entry_price * size)) * 100
-        
-        self.trades.append({
-            'entry_time': self.position['entry_time'],
-            'exit_time': timestamp,
-            'entry_price': entry_price,
-            'exit_price': price,
-            'type': 'BUY',
-            'size': size,
-            'pnl': net_pnl,
-            'pnl_pct': pnl_pct,
-            'reason': reason
+    def get_equity_curve(self):
+        """Strategy equity per bar with running peak and drawdown (built on demand, e.g. for plotting)"""
+        peak, drawdown = drawdown_curve(self.equity)
+        return pd.DataFrame({
+            'timestamp': self.timestamps,
+            'equity': self.equity,
+            'peak': peak,
+            'drawdown': drawdown
         })
-        
-        self.position = None
-        # print(f"[SELL] Price: {price:.2f}, PnL: {net_pnl:.2f}, Bal: {self.balance:.2f}")
 
-    def _execute_cover(self, price, timestamp, reason):
-        # Closing a SHORT position (Buying back)
-        # Apply slippage (buy higher)
-        price = price * (1 + self.slippage_pct)
-        
-        size = self.position['size']
-        cost = price * size
-        fee = cost * self.fee_pct
-        
-        # Return collateral + PnL
-        entry_val = self.position['entry_price'] * size
-        
-        # Formula: Balance += EntryVal (Margin Release) + (EntryVal - Cost - Fee) (PnL)
-        # Simplified: Balance += 2*EntryVal - Cost - Fee
-        self.balance += (2 * entry_val) - cost - fee
-        
-        # Trade Stats
-        entry_price = self.position['entry_price']
-        gross_pnl = (entry_price - price) * size
-        total_fees = (entry_price * size * self.fee_pct) + (price * size * self.fee_pct)
-        net_pnl = gross_pnl - total_fees
-        
-        pnl_pct = (net_pnl / (entry_price * size)) * 100
-        
-        self.trades.append({
-            'entry_time': self.position['entry_time'],
-            'exit_time': timestamp,
-            'entry_price': entry_price,
-            'exit_price': price,
-            'type': 'SELL',
-            'size': size,
-            'pnl': net_pnl,
-            'pnl_pct': pnl_pct,
-            'reason': reason
-        })
-        
-        self.position = None
-        # print(f"[COVER] Price: {price:.2f}, PnL: {net_pnl:.2f}, Bal: {self.balance:.2f}")
+    def get_benchmark_curve(self):
+        """Buy & Hold equity per bar (built on demand)"""
+        return pd.DataFrame({'timestamp': self.timestamps, 'equity': self.benchmark})
 
     def _calculate_metrics(self):
-        df_equity = pd.DataFrame(self.equity_curve)
-        df_benchmark = pd.DataFrame(self.benchmark_curve)
+        equity = self.equity
         
-        if df_equity.empty:
+        if equity is None or len(equity) == 0:
             return {}
 
-        final_equity = df_equity.iloc[-1]['equity']
+        final_equity = equity[-1]
         roi = ((final_equity - self.initial_capital) / self.initial_capital) * 100
         
         # Max Drawdown
-        df_equity['peak'] = df_equity['equity'].cummax()
-        df_equity['drawdown'] = (df_equity['equity'] - df_equity['peak']) / df_equity['peak']
-        max_drawdown = df_equity['drawdown'].min() * 100
+        max_dd = max_drawdown(equity) * 100
         
         # Trade Stats
-        wins = [t for t in self.trades if t['pnl'] > 0]
-        losses = [t for t in self.trades if t['pnl'] <= 0]
+        pnl = self.trade_cols['pnl']
+        wins = pnl > 0
         
-        win_rate = (len(wins) / len(self.trades)) * 100 if self.trades else 0
+        win_rate = (np.count_nonzero(wins) / len(pnl)) * 100 if len(pnl) else 0
         
-        total_profit = sum(t['pnl'] for t in wins)
-        total_loss = abs(sum(t['pnl'] for t in losses))
+        total_profit = pnl[wins].sum()
+        total_loss = abs(pnl[~wins].sum())
         profit_factor = total_profit / total_loss if total_loss > 0 else 999
         
         # Sharpe Ratio (Simplified assuming daily returns)
         # Need to resample equity curve to daily if it's hourly
         # For simplicity, calculate based on period returns
-        df_equity['returns'] = df_equity['equity'].pct_change()
+        returns = np.empty(len(equity) - 1)
+        np.subtract(equity[1:], equity[:-1], out=returns)
+        returns /= equity[:-1]
+        std = returns.std(ddof=1) # Sample std, as pandas computed it
         sharpe = 0
-        if df_equity['returns'].std() > 0:
-            sharpe = (df_equity['returns'].mean() / df_equity['returns'].std()) * np.sqrt(252*24) # Assuming hourly data
+        if std > 0:
+            sharpe = (returns.mean() / std) * np.sqrt(252*24) # Assuming hourly data
             
         return {
             'initial_capital': self.initial_capital,
             'final_equity': final_equity,
             'roi': roi,
-            'max_drawdown': max_drawdown,
-            'total_trades': len(self.trades),
+            'max_drawdown': max_dd,
+            'total_trades': len(pnl),
             'win_rate': win_rate,
             'profit_factor': profit_factor,
             'sharpe_ratio': sharpe,
             'trades': self.trades,
-            'equity_curve': df_equity,
-            'benchmark_curve': df_benchmark
+            'benchmark_final_equity': self.benchmark[-1]
         }
 
     def plot_results(self, results):
-        df_equity = results['equity_curve']
-        df_benchmark = results['benchmark_curve']
+        df_equity = self.get_equity_curve()
+        df_benchmark = self.get_benchmark_curve()
         trades = results['trades']
         
-        plt.style.use('dark_background')
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [3, 1]})
+        if Backtester._fig is None:
+            plt.style.use('dark_background')
+            Backtester._fig, Backtester._axes = plt.subplots(2, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [3, 1]})
+        fig = Backtester._fig
+        ax1, ax2 = Backtester._axes
+        ax1.clear()
+        ax2.clear()
         
         # Plot 1: Equity Curve vs Benchmark
         ax1.plot(df_equity['timestamp'], df_equity['equity'], label='Strategy Equity', color='cyan', linewidth=1.5)
@@ -430,13 +509,13 @@ class Backtester:
         ax2.set_ylabel("Drawdown %")
         ax2.grid(True, alpha=0.2)
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Format dates
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        plt.gcf().autofmt_xdate()
+        ax2.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        fig.autofmt_xdate()
         
         filename = f"backtest_result_{int(pd.Timestamp.now().timestamp())}.png"
-        plt.savefig(filename)
+        fig.savefig(filename)
         print(f"Chart saved to {filename}")
         # plt.show() # Can't show in headless env usually
@@ -0,0 +1,26 @@
+"""
+Terminal colour setup shared by the CLI entry points and modules that print.
+"""
+import sys
+from colorama import init, Fore, Back, Style
+
+_initialized = False
+
+def init_console():
+    """
+    Enables colorama when stdout is a terminal. When output is piped, blanks
+    the colour codes instead, so logs stay plain text and colorama doesn't
+    have to wrap and strip every write.
+    """
+    global _initialized
+    if _initialized:
+        return
+    _initialized = True
+
+    if sys.stdout.isatty():
+        init(autoreset=True)
+        return
+    # Fore/Back/Style are shared objects, so this covers every importing module
+    for codes in (Fore, Back, Style):
+        for name in list(vars(codes)):
+            setattr(codes, name, '')
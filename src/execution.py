@@ -2,13 +2,17 @@ import ccxt
 from colorama import Fore, Style
 import time
 import csv
+import atexit
 import os
-from datetime import datetime
+import pandas as pd
 
 class TradeExecutor:
-    def __init__(self, market_provider):
+    def __init__(self, market_provider, balance_ttl=5):
         self.provider = market_provider
         self.exchange = market_provider.exchange
+        self.balance_ttl = balance_ttl # Seconds a fetched balance is reused
+        self._balance = None
+        self._balance_time = 0.0
 
     def execute_order(self, symbol, side, amount, price=None, order_type='market'):
         """
@@ -19,23 +23,14 @@ class TradeExecutor:
         :param price: Price for limit orders (optional)
         :param order_type: 'market' or 'limit'
         """
-        if not self.exchange:
-            print(Fore.RED + "[!] Exchange not initialized. Cannot trade.")
-            return None
-
-        # Check if we are on Fallback (Read-Only)
-        if self.provider.using_fallback:
-            print(Fore.RED + "[!] Using Public Data Node (Read-Only). Cannot execute trades.")
-            print(Fore.RED + "[!] Please check your Tokocrypto API Keys and Internet Connection.")
-            return None
-
-        # Check API Keys (Double Check)
-        if not self.exchange.apiKey or not self.exchange.secret:
-            print(Fore.RED + "[!] API Keys missing. Cannot execute trades.")
+        # Worked out once by the provider when it connects
+        if not self.provider.writable:
+            self._report_read_only()
             return None
 
         try:
             print(Fore.YELLOW + f"[*] Submitting {side.upper()} order for {amount} {symbol}...")
+            self._balance = None # Balance changes once the order goes through
             
             if order_type == 'market':
                 order = self.exchange.create_market_order(symbol, side, amount)
@@ -58,28 +53,70 @@ class TradeExecutor:
         
         return None
 
+    def _report_read_only(self):
+        """Explains why orders can't be placed"""
+        if not self.provider.exchange:
+            print(Fore.RED + "[!] Exchange not initialized. Cannot trade.")
+        elif self.provider.using_fallback:
+            # On Fallback (Read-Only)
+            print(Fore.RED + "[!] Using Public Data Node (Read-Only). Cannot execute trades.")
+            print(Fore.RED + "[!] Please check your Tokocrypto API Keys and Internet Connection.")
+        else:
+            print(Fore.RED + "[!] API Keys missing. Cannot execute trades.")
+
     def get_balance(self, currency):
         """Fetch free balance for a specific currency (e.g., 'USDT')"""
         if self.provider.using_fallback:
             return 0.0
 
         try:
-            balance = self.exchange.fetch_balance()
-            return balance.get(currency, {}).get('free', 0.0)
+            # One fetch_balance returns every currency, so reuse it for a few
+            # seconds instead of paying a round-trip per currency lookup
+            now = time.monotonic()
+            if self._balance is None or now - self._balance_time > self.balance_ttl:
+                self._balance = self.exchange.fetch_balance()
+                self._balance_time = now
+            return self._balance.get(currency, {}).get('free', 0.0)
         except Exception as e:
             print(Fore.RED + f"[!] Failed to fetch balance: {e}")
             return 0.0
 
+    # SL/TP levels are only tracked for paper trades; these no-ops keep the
+    # same interface as PaperTradeExecutor so callers don't need to probe
+    def set_position_levels(self, symbol, side, entry, sl, tp):
+        pass
+
+    def get_position_levels(self, symbol):
+        return None
+
+    def clear_position_levels(self, symbol):
+        pass
+
 class PaperTradeExecutor:
     """
     Simulates trade execution for forward testing / paper trading.
     Tracks virtual portfolio and logs orders to CSV.
     """
-    def __init__(self, initial_balance_usdt=1000.0):
+    def __init__(self, initial_balance_usdt=1000.0, flush_every=32, verbose=True):
         self.balance_usdt = initial_balance_usdt
         self.positions = {}
         self.history_file = 'paper_trade_history.csv'
         self.position_levels = {}
+        self.position_costs = {} # symbol -> (qty, avg_cost), kept in step with the history log
+        self._symbol_parts = {} # symbol -> (base, quote), split once per symbol
+        self._order_seq = 0 # Paper order IDs are numbered per session
+        self._ts_second = None # Epoch second of the cached log timestamp
+        self._ts_text = ''
+        # History log handle kept open for the session (opened on the first flush);
+        # rows are queued and written in batches of flush_every, and at exit
+        self._history_fh = None
+        self._history_writer = None
+        self._pending_rows = []
+        self.flush_every = flush_every
+        # Fill and skip messages are only built and printed when verbose; simulated
+        # runs with many orders can turn them off (failures are always printed)
+        self.verbose = verbose
+        atexit.register(self.close)
         self._init_history_file()
         self._restore_state_from_history(initial_balance_usdt)
 
@@ -93,35 +130,42 @@ class PaperTradeExecutor:
         if not os.path.exists(self.history_file):
             return
         try:
-            with open(self.history_file, 'r') as f:
-                reader = csv.DictReader(f)
-                last_balance = None
-                for row in reader:
-                    symbol = row.get('Symbol')
-                    side = row.get('Type')
-                    amount_str = row.get('Amount')
-                    balance_str = row.get('Balance (USDT)')
-                    if not symbol or not side or not amount_str:
-                        continue
-                    try:
-                        amount = float(amount_str)
-                    except ValueError:
-                        continue
-                    base_currency = symbol.split('/')[0]
-                    if side.upper() == 'BUY':
-                        self.positions[base_currency] = self.positions.get(base_currency, 0.0) + amount
-                    elif side.upper() == 'SELL':
-                        self.positions[base_currency] = max(self.positions.get(base_currency, 0.0) - amount, 0.0)
-                    if balance_str:
-                        last_balance = balance_str
-                if last_balance is not None:
-                    try:
-                        self.balance_usdt = float(last_balance)
-                    except ValueError:
-                        self.balance_usdt = initial_balance_usdt
+            # Parse the whole log in one go (round_trip keeps floats identical to float())
+            history = pd.read_csv(self.history_file, dtype={'Symbol': str, 'Type': str, 'Balance (USDT)': str},
+                                  float_precision='round_trip', on_bad_lines='skip')
+            if history.empty:
+                return
+            amounts = pd.to_numeric(history['Amount'], errors='coerce')
+            prices = pd.to_numeric(history['Price'], errors='coerce')
+            valid = history['Symbol'].notna() & history['Type'].notna() & amounts.notna()
+            history = history[valid]
+
+            # Holdings are floored at zero trade by trade, so replay the fills in order
+            for symbol, side, amount, price in zip(history['Symbol'].tolist(), history['Type'].str.upper().tolist(),
+                                                   amounts[valid].tolist(), prices[valid].tolist()):
+                base_currency = self._split_symbol(symbol)[0]
+                if side == 'BUY':
+                    self.positions[base_currency] = self.positions.get(base_currency, 0.0) + amount
+                elif side == 'SELL':
+                    self.positions[base_currency] = max(self.positions.get(base_currency, 0.0) - amount, 0.0)
+                if not pd.isna(price):
+                    self._update_position_cost(symbol, side, amount, price)
+
+            balances = history['Balance (USDT)'].dropna()
+            if len(balances):
+                try:
+                    self.balance_usdt = float(balances.iloc[-1])
+                except ValueError:
+                    self.balance_usdt = initial_balance_usdt
         except Exception:
             self.balance_usdt = initial_balance_usdt
 
+    def _split_symbol(self, symbol):
+        parts = self._symbol_parts.get(symbol)
+        if parts is None:
+            parts = self._symbol_parts[symbol] = tuple(symbol.split('/', 1))
+        return parts
+
     def get_balance(self, currency):
         """Returns virtual balance"""
         if currency == 'USDT':
@@ -143,35 +187,26 @@ class PaperTradeExecutor:
         if symbol in self.position_levels:
             del self.position_levels[symbol]
 
+    def _update_position_cost(self, symbol, side, amount, price):
+        """Rolls one fill into the symbol's running quantity and average cost"""
+        qty, avg_cost = self.position_costs.get(symbol, (0.0, 0.0))
+        if side == 'BUY':
+            current_val = qty * avg_cost
+            new_val = amount * price
+            total_qty = qty + amount
+            if total_qty > 0:
+                avg_cost = (current_val + new_val) / total_qty
+            qty = total_qty
+        elif side == 'SELL':
+            qty = max(qty - amount, 0.0)
+        self.position_costs[symbol] = (qty, avg_cost)
+
     def get_position_info(self, symbol, current_price):
-        if not os.path.exists(self.history_file):
+        qty, avg_cost = self.position_costs.get(symbol, (0.0, 0.0))
+        if qty <= 0 or avg_cost <= 0:
             return None
-        qty = 0.0
-        avg_cost = 0.0
-        base_currency = symbol.split('/')[0]
+        base_currency = self._split_symbol(symbol)[0]
         try:
-            with open(self.history_file, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('Symbol') != symbol:
-                        continue
-                    side = row.get('Type', '').upper()
-                    try:
-                        amount = float(row.get('Amount', '0'))
-                        price = float(row.get('Price', '0'))
-                    except ValueError:
-                        continue
-                    if side == 'BUY':
-                        current_val = qty * avg_cost
-                        new_val = amount * price
-                        total_qty = qty + amount
-                        if total_qty > 0:
-                            avg_cost = (current_val + new_val) / total_qty
-                        qty = total_qty
-                    elif side == 'SELL':
-                        qty = max(qty - amount, 0.0)
-            if qty <= 0 or avg_cost <= 0:
-                return None
             value_now = qty * current_price
             cost_total = qty * avg_cost
             unrealized = value_now - cost_total
@@ -196,12 +231,11 @@ class PaperTradeExecutor:
         :param amount: quantity
         :param price: current market price
         """
-        base_currency = symbol.split('/')[0] # BTC
-        quote_currency = symbol.split('/')[1] # USDT
+        base_currency, quote_currency = self._split_symbol(symbol) # BTC, USDT
         
         value = amount * price
         
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = self._timestamp()
         
         if side == 'buy':
             # Check if we already have a position in this asset
@@ -210,15 +244,18 @@ class PaperTradeExecutor:
             # Simple Logic: Don't buy if we already have a significant position (e.g. > $1 value)
             # This prevents "spam buying" on every loop iteration for the same signal
             if current_qty * price > 1.0:
-                 print(Fore.YELLOW + f"[PAPER TRADE] Position exists ({current_qty:.4f} {base_currency}). Skipping BUY to avoid duplicates.")
+                 if self.verbose:
+                     print(Fore.YELLOW + f"[PAPER TRADE] Position exists ({current_qty:.4f} {base_currency}). Skipping BUY to avoid duplicates.")
                  return None
 
             if self.balance_usdt >= value:
                 self.balance_usdt -= value
                 self.positions[base_currency] = current_qty + amount
-                print(Fore.GREEN + f"[PAPER TRADE] BUY {amount} {base_currency} @ {price} | Cost: ${value:.2f}")
+                self._update_position_cost(symbol, 'BUY', amount, price)
+                if self.verbose:
+                    print(Fore.GREEN + f"[PAPER TRADE] BUY {amount} {base_currency} @ {price} | Cost: ${value:.2f}")
                 self._log_trade(timestamp, symbol, 'BUY', amount, price, value)
-                return {'id': f'paper_{int(time.time())}', 'status': 'closed'}
+                return self._paper_order()
             else:
                 print(Fore.RED + f"[PAPER TRADE] Insufficient Virtual USDT. Balance: ${self.balance_usdt:.2f}, Required: ${value:.2f}")
                 return None
@@ -228,18 +265,52 @@ class PaperTradeExecutor:
             if current_qty >= amount:
                 self.positions[base_currency] = current_qty - amount
                 self.balance_usdt += value
-                print(Fore.GREEN + f"[PAPER TRADE] SELL {amount} {base_currency} @ {price} | Value: ${value:.2f}")
+                self._update_position_cost(symbol, 'SELL', amount, price)
+                if self.verbose:
+                    print(Fore.GREEN + f"[PAPER TRADE] SELL {amount} {base_currency} @ {price} | Value: ${value:.2f}")
                 self._log_trade(timestamp, symbol, 'SELL', amount, price, value)
-                return {'id': f'paper_{int(time.time())}', 'status': 'closed'}
+                return self._paper_order()
             else:
                 print(Fore.RED + f"[PAPER TRADE] Insufficient Virtual {base_currency}. Owned: {current_qty}")
                 return None
 
+    def _timestamp(self):
+        """Local time for the history log, formatted at most once per second"""
+        now = int(time.time())
+        if now != self._ts_second:
+            self._ts_second = now
+            self._ts_text = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+        return self._ts_text
+
+    def _paper_order(self):
+        self._order_seq += 1
+        return {'id': f'paper_{self._order_seq}', 'status': 'closed'}
+
     def _log_trade(self, timestamp, symbol, side, amount, price, value):
+        self._pending_rows.append([timestamp, symbol, side, amount, price, value, self.balance_usdt])
+        if len(self._pending_rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Writes all queued trade rows to the history log in one batch"""
+        if not self._pending_rows:
+            return
         try:
-            with open(self.history_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([timestamp, symbol, side, amount, price, value, self.balance_usdt])
-            print(Fore.CYAN + f"[PAPER TRADE] Logged to {self.history_file}")
+            if self._history_writer is None:
+                self._history_fh = open(self.history_file, 'a', newline='', buffering=1 << 16)
+                self._history_writer = csv.writer(self._history_fh)
+            self._history_writer.writerows(self._pending_rows)
+            self._history_fh.flush()
+            if self.verbose:
+                print(Fore.CYAN + f"[PAPER TRADE] Logged {len(self._pending_rows)} trade(s) to {self.history_file}")
+            self._pending_rows.clear()
         except Exception as e:
             print(Fore.RED + f"[!] Error logging paper trade: {e}")
+
+    def close(self):
+        """Flushes queued trades and closes the trade history log"""
+        self.flush()
+        if self._history_fh is not None:
+            self._history_fh.close()
+            self._history_fh = None
+            self._history_writer = None
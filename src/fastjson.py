@@ -0,0 +1,11 @@
+"""
+Optional orjson support.
+loads parses JSON from bytes (or str) with orjson when it's installed and
+falls back to the standard library json module otherwise.
+"""
+try:
+    from orjson import loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    from json import loads
+    ORJSON_AVAILABLE = False
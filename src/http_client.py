@@ -0,0 +1,31 @@
+"""
+Shared HTTP sessions.
+Keep-alive connection pools shared across modules, instead of each module
+handshaking its own TCP/TLS connections.
+SESSION is a plain pool without retries. It is the one handed to the CCXT
+clients, so every request they make passes through their own rate limiter
+and error mapping (RateLimitExceeded, DDoSProtection, ...).
+RETRY_SESSION is for the direct REST calls (CoinGecko, Tokocrypto, Fear &
+Greed): server/gateway errors (5xx) on GETs are retried up to twice with a
+short backoff (not any Retry-After wait). Rate-limit responses (429) are
+never retried, and neither are connection errors and timeouts, so a caller's
+timeout bounds how long a failed request blocks.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+def _session(max_retries):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = _USER_AGENT
+    return session
+
+SESSION = _session(0)
+# urllib3 would otherwise also retry a 429 carrying Retry-After, sleeping for it
+RETRY_SESSION = _session(Retry(total=2, connect=0, read=0, other=0, backoff_factor=0.2,
+                               status_forcelist=[500, 502, 503, 504], respect_retry_after_header=False))
@@ -0,0 +1,16 @@
+"""
+Optional Numba support.
+If numba isn't installed, njit becomes a no-op decorator so the kernels
+still run as plain Python (just slower).
+"""
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # Handles both @njit and @njit(cache=True)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -1,32 +1,81 @@
 import ccxt
+import asyncio
+import atexit
+import time
 import pandas as pd
 import numpy as np
-import requests
 from datetime import datetime, timedelta
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from colorama import init, Fore, Style
+from colorama import Fore, Style
+from src.console import init_console
+from src.fastjson import loads
+from src.http_client import SESSION, RETRY_SESSION
 
 load_dotenv()
-init(autoreset=True)
+init_console()
+
+# Base currency -> CoinGecko coin ID for the simulation price lookup
+COINGECKO_IDS = {
+    'BTC': 'bitcoin', 'ETH': 'ethereum', 'BNB': 'binancecoin',
+    'SOL': 'solana', 'XRP': 'ripple', 'ADA': 'cardano',
+    'DOGE': 'dogecoin', 'AVAX': 'avalanche-2', 'DOT': 'polkadot',
+    'MATIC': 'matic-network', 'TRX': 'tron', 'LTC': 'litecoin'
+}
+
+# Positions of Open Time, Open, High, Low, Close, Volume in a Tokocrypto kline
+# (the rest are Close Time, quote volume, trade count, ...)
+TOKO_KLINE_COLUMNS = (0, 1, 2, 3, 4, 5)
+
+# Candle length per timeframe, for laying out mock candles
+_TF_DELTA = {
+    '1m': timedelta(minutes=1), '3m': timedelta(minutes=3), '5m': timedelta(minutes=5),
+    '15m': timedelta(minutes=15), '30m': timedelta(minutes=30),
+    '1h': timedelta(hours=1), '2h': timedelta(hours=2), '4h': timedelta(hours=4),
+    '6h': timedelta(hours=6), '12h': timedelta(hours=12),
+    '1d': timedelta(days=1), '3d': timedelta(days=3), '1w': timedelta(weeks=1)
+}
 
 class MarketDataProvider:
     def __init__(self, exchange_id='tokocrypto'):
         self.exchange_id = exchange_id
         self.exchange = None
         self.using_fallback = False
+        # Whether orders can be placed (connected to the exchange itself, with API keys);
+        # set when connecting so order paths don't re-check it every time
+        self.writable = False
+        self._fallback_lock = threading.Lock()
+        # The sync CCXT client's rate limiter isn't thread-safe, so its calls are made
+        # one at a time; only the direct REST fallbacks overlap across threads
+        self._ccxt_lock = threading.Lock()
+        self._ohlcv_cache = {} # (symbol, timeframe) -> last fetched candles
+        self._coingecko_cache = {} # symbol -> (price, expiry on the monotonic clock)
+        self.coingecko_ttl = 60
+        self._toko_ticker_index = ({}, 0.0) # (clean symbol -> 24hr ticker, expiry on the monotonic clock)
+        self.ticker_index_ttl = 5
+
+        # Shared keep-alive sessions, so repeated requests reuse the TCP/TLS connection
+        # instead of handshaking each time. CCXT gets the one without retries (it rate
+        # limits and maps errors itself); the direct REST calls retry server errors.
+        self.session = SESSION
+        self.rest_session = RETRY_SESSION
         
         # 1. Try Tokocrypto Direct
         try:
             print(Fore.YELLOW + f"Initializing connection to {exchange_id}...")
-            self.exchange = getattr(ccxt, exchange_id)({
+            # Kept for the async client in get_tickers_async
+            self._exchange_config = {
                 'enableRateLimit': True,
                 'apiKey': os.getenv('TOKOCRYPTO_API_KEY'),
                 'secret': os.getenv('TOKOCRYPTO_SECRET_KEY'),
                 'timeout': 5000,
-            })
+            }
+            self.exchange = getattr(ccxt, exchange_id)(dict(self._exchange_config, session=self.session))
             # Test connection
             self.exchange.fetch_time()
+            self.writable = bool(self.exchange.apiKey and self.exchange.secret)
             print(Fore.GREEN + f"Successfully connected to {exchange_id}.")
         except Exception as e:
             print(Fore.RED + f"[!] Connection Error to {exchange_id}: {str(e)}")
@@ -34,14 +83,20 @@ class MarketDataProvider:
 
     def _switch_to_fallback(self):
         """Switches to Binance Public Data Node"""
-        if self.using_fallback:
-            return
+        # Ticker and OHLCV may be fetched concurrently; only one thread should switch
+        with self._fallback_lock:
+            if self.using_fallback:
+                return
+            self._connect_fallback()
 
+    def _connect_fallback(self):
+        self.writable = False # The public data node is read-only
         print(Fore.YELLOW + f"[*] Attempting fallback to Binance Public Data Node (same liquidity source)...")
         try:
             self.exchange = ccxt.binance({
                 'enableRateLimit': True,
                 'timeout': 10000,
+                'session': self.session,
                 'options': {'defaultType': 'spot'}, 
                 'urls': {
                     'api': {
@@ -51,7 +106,8 @@ class MarketDataProvider:
                     }
                 }
             })
-            self.exchange.load_markets()
+            with self._ccxt_lock:
+                self.exchange.load_markets()
             self.using_fallback = True
             print(Fore.GREEN + f"[*] Successfully connected to Binance Public Data Node (Live Market Data).")
         except Exception as e2:
@@ -60,49 +116,57 @@ class MarketDataProvider:
 
     def _fetch_coingecko_price(self, symbol):
         """Fetches real price from CoinGecko as fallback for simulation"""
-        try:
+        return self._fetch_coingecko_prices([symbol]).get(symbol)
+
+    def _fetch_coingecko_prices(self, symbols):
+        """
+        CoinGecko prices for several symbols, {symbol: price or None}.
+        Prices are cached for coingecko_ttl seconds and any missing ones
+        are requested together in one call.
+        """
+        now = time.monotonic()
+        prices = {}
+        missing = {} # coin_id -> symbols
+        for symbol in symbols:
+            cached = self._coingecko_cache.get(symbol)
+            if cached and now < cached[1]:
+                prices[symbol] = cached[0]
+                continue
+            prices[symbol] = None
             # Map common symbols to CoinGecko IDs
-            mapper = {
-                'BTC': 'bitcoin', 'ETH': 'ethereum', 'BNB': 'binancecoin',
-                'SOL': 'solana', 'XRP': 'ripple', 'ADA': 'cardano',
-                'DOGE': 'dogecoin', 'AVAX': 'avalanche-2', 'DOT': 'polkadot',
-                'MATIC': 'matic-network', 'TRX': 'tron', 'LTC': 'litecoin'
-            }
-            
-            base_currency = symbol.split('/')[0].upper()
-            coin_id = mapper.get(base_currency)
-            
-            if not coin_id:
-                return None
-                
-            url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
-            response = requests.get(url, timeout=5)
-            data = response.json()
-            
-            if coin_id in data:
-                return float(data[coin_id]['usd'])
-            return None
+            coin_id = COINGECKO_IDS.get(symbol.split('/')[0].upper())
+            if coin_id:
+                missing.setdefault(coin_id, []).append(symbol)
+
+        if not missing:
+            return prices
+        try:
+            url = f"https://api.coingecko.com/api/v3/simple/price?ids={','.join(missing)}&vs_currencies=usd"
+            response = self.rest_session.get(url, timeout=5)
+            data = loads(response.content)
+            expiry = time.monotonic() + self.coingecko_ttl
+            for coin_id, coin_symbols in missing.items():
+                if coin_id in data:
+                    price = float(data[coin_id]['usd'])
+                    for symbol in coin_symbols:
+                        prices[symbol] = price
+                        self._coingecko_cache[symbol] = (price, expiry)
         except:
-            return None
+            pass
+        return prices
 
     def _fetch_tokocrypto_direct(self, endpoint, params):
         """
         Direct REST API call to Tokocrypto (bypassing CCXT if needed)
         Docs: https://www.tokocrypto.com/apidocs/
+        Symbols in params must already be in Tokocrypto form, without slash (e.g. BTCUSDT).
         """
         base_url = "https://www.tokocrypto.com"
         url = f"{base_url}{endpoint}"
         try:
-            # Tokocrypto requires symbols without slash (e.g. BTCUSDT)
-            if 'symbol' in params:
-                params['symbol'] = params['symbol'].replace('/', '')
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, params=params, headers=headers, timeout=5)
+            response = self.rest_session.get(url, params=params, timeout=5)
             if response.status_code == 200:
-                data = response.json()
+                data = loads(response.content)
                 # Check for API error structure {code: 0, msg: "...", data: ...}
                 if isinstance(data, dict) and 'code' in data and data['code'] == 0:
                     return data['data']
@@ -124,12 +188,9 @@ class MarketDataProvider:
         # 1. Try CCXT first (if connected)
         try:
             if self.exchange and not self.using_fallback:
-                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                cols = ['open', 'high', 'low', 'close', 'volume']
-                df[cols] = df[cols].apply(pd.to_numeric)
-                return df
+                with self._ccxt_lock:
+                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                return self._ohlcv_to_df(ohlcv)
         except Exception as e:
             print(Fore.YELLOW + f"[!] CCXT Error: {e}")
 
@@ -138,7 +199,7 @@ class MarketDataProvider:
         try:
             # Map timeframe to Tokocrypto format if needed (usually same as Binance)
             toko_params = {
-                'symbol': symbol,
+                'symbol': symbol.replace('/', ''), # Tokocrypto requires symbols without slash (e.g. BTCUSDT)
                 'interval': timeframe,
                 'limit': limit
             }
@@ -147,11 +208,7 @@ class MarketDataProvider:
             if data and isinstance(data, list):
                 # Tokocrypto klines format is list of lists, similar to Binance
                 # [Open Time, Open, High, Low, Close, Volume, Close Time, ...]
-                df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'q_vol', 'trades', 't_base', 't_quote', 'ignore'])
-                df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                cols = ['open', 'high', 'low', 'close', 'volume']
-                df[cols] = df[cols].apply(pd.to_numeric)
+                df = self._ohlcv_to_df(data, TOKO_KLINE_COLUMNS)
                 print(Fore.GREEN + f"[*] Success: Retrieved data from Tokocrypto Direct API.")
                 return df
         except Exception as e:
@@ -163,16 +220,98 @@ class MarketDataProvider:
                 self._switch_to_fallback()
             
             if self.exchange:
-                 ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-                 df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                 df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                 cols = ['open', 'high', 'low', 'close', 'volume']
-                 df[cols] = df[cols].apply(pd.to_numeric)
-                 return df
+                 with self._ccxt_lock:
+                     ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                 return self._ohlcv_to_df(ohlcv)
         except Exception as e:
             print(f"\n[!] All Connections Failed: {str(e)}")
-            print(f"[!] Switching to SIMULATION MODE (Mock Data).")
-            return self._generate_mock_data(symbol, timeframe, limit)
+
+        print(f"[!] Switching to SIMULATION MODE (Mock Data).")
+        return self._generate_mock_data(symbol, timeframe, limit)
+
+    def fetch_ohlcv_incremental(self, symbol, timeframe, limit=100):
+        """
+        Same result as fetch_ohlcv, but once a symbol/timeframe has been loaded
+        only the candles since the last cached one are downloaded.
+        The last cached candle is re-fetched too, since it was still forming.
+        When the cache is `limit` candles or more behind, the history is
+        reloaded instead, as one page from `since` would stop short of now.
+        """
+        key = (symbol, timeframe)
+        cached = self._ohlcv_cache.get(key)
+
+        if cached is not None and len(cached) >= limit and self.exchange:
+            try:
+                since_ms = int(cached['timestamp'].iat[-1].value // 1_000_000)
+                tf_ms = self.exchange.parse_timeframe(timeframe) * 1000
+                behind = (time.time() * 1000 - since_ms) // tf_ms
+                ohlcv = None
+                if behind < limit:
+                    with self._ccxt_lock:
+                        ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=since_ms, limit=limit)
+                # A full page may not reach the latest candle
+                if ohlcv and len(ohlcv) < limit:
+                    new_df = self._ohlcv_to_df(ohlcv)
+                    kept = cached[cached['timestamp'] < new_df['timestamp'].iat[0]]
+                    df = pd.concat([kept, new_df], ignore_index=True).iloc[-limit:].reset_index(drop=True)
+                    self._ohlcv_cache[key] = df
+                    return df
+            except Exception as e:
+                print(Fore.YELLOW + f"[!] Incremental OHLCV update failed, reloading history: {e}")
+
+        df = self.fetch_ohlcv(symbol, timeframe, limit)
+        # Mock candles are regenerated on every call, never extend them
+        if not df.attrs.get('is_mock'):
+            self._ohlcv_cache[key] = df
+        return df
+
+    def _ohlcv_to_df(self, rows, columns=None):
+        """
+        Builds the candle frame from [Open Time (ms), Open, High, Low, Close, Volume] rows,
+        converting the whole response to float64 in one pass (numeric strings and None
+        included). For wider rows (Tokocrypto klines), columns gives the positions of
+        those six fields and only they are converted.
+        """
+        if not len(rows):
+            arr = np.empty((0, 6))
+        elif columns is None:
+            arr = np.asarray(rows, dtype=np.float64)
+        else:
+            arr = np.asarray(rows, dtype=object)[:, list(columns)].astype(np.float64)
+        df = pd.DataFrame(arr[:, 1:6], columns=['open', 'high', 'low', 'close', 'volume'])
+        df.insert(0, 'timestamp', pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms'))
+        return df
+
+    def fetch_snapshot(self, symbol, timeframe, limit=100, with_ticker=True):
+        """
+        Fetches ticker info and OHLCV for the same symbol concurrently; when
+        both come from the direct REST fallbacks the wait is the slower of the
+        two requests instead of their sum.
+        Returns (ticker, df); ticker is None if its request raised or
+        with_ticker is False.
+        """
+        return self.fetch_snapshots([symbol], timeframe, limit, with_ticker)[symbol]
+
+    def fetch_snapshots(self, symbols, timeframe, limit=100, with_ticker=True):
+        """
+        Fetches snapshots for several symbols at once. Returns {symbol: (ticker, df)}.
+        Requests through the CCXT client are made one after another (its throttle
+        isn't thread-safe), so the overlap comes from the direct REST fallbacks
+        and the DataFrame work.
+        """
+        workers = 2 * len(symbols) if with_ticker else len(symbols)
+        with ThreadPoolExecutor(max_workers=min(8, workers)) as pool:
+            ticker_futures = {s: pool.submit(self.get_ticker_info, s) for s in symbols} if with_ticker else {}
+            ohlcv_futures = {s: pool.submit(self.fetch_ohlcv_incremental, s, timeframe, limit) for s in symbols}
+            snapshots = {}
+            for s in symbols:
+                df = ohlcv_futures[s].result()
+                try:
+                    ticker = ticker_futures[s].result() if with_ticker else None
+                except Exception:
+                    ticker = None
+                snapshots[s] = (ticker, df)
+        return snapshots
 
     def get_ticker_info(self, symbol):
         """
@@ -181,36 +320,45 @@ class MarketDataProvider:
         # 1. Try CCXT
         try:
             if self.exchange and not self.using_fallback:
-                ticker = self.exchange.fetch_ticker(symbol)
+                with self._ccxt_lock:
+                    ticker = self.exchange.fetch_ticker(symbol)
                 return self._format_ticker(ticker, symbol)
         except:
             pass
 
         # 2. Try Direct Tokocrypto API
         try:
-            # Endpoint: /open/v1/market/ticker/24hr
-            data = self._fetch_tokocrypto_direct('/open/v1/market/ticker/24hr', {'symbol': symbol})
-            
-            if data:
-                if isinstance(data, list):
-                    # Filter list for correct symbol
-                    clean_symbol = symbol.replace('/', '')
-                    ticker_data = next((item for item in data if item['symbol'] == clean_symbol), None)
-                else:
-                    ticker_data = data
+            # Tokocrypto requires symbols without slash (e.g. BTCUSDT)
+            clean_symbol = symbol.replace('/', '')
+            ticker_data = None
+            index, expiry = self._toko_ticker_index
+            if clean_symbol in index and time.monotonic() < expiry:
+                ticker_data = index[clean_symbol]
+            else:
+                # Endpoint: /open/v1/market/ticker/24hr
+                data = self._fetch_tokocrypto_direct('/open/v1/market/ticker/24hr', {'symbol': clean_symbol})
+                if data:
+                    if isinstance(data, list):
+                        # The endpoint answered with every symbol; index it so lookups for
+                        # other symbols skip the request (reversed so the first entry wins)
+                        index = {item['symbol']: item for item in reversed(data)}
+                        self._toko_ticker_index = (index, time.monotonic() + self.ticker_index_ttl)
+                        ticker_data = index.get(clean_symbol)
+                    else:
+                        ticker_data = data
                 
-                if ticker_data:
-                    price = float(ticker_data.get('lastPrice') or 0)
-                    if price > 0:
-                        return {
-                            'symbol': symbol,
-                            'price': price,
-                            'change_24h': float(ticker_data.get('priceChangePercent') or 0),
-                            'high_24h': float(ticker_data.get('highPrice') or 0),
-                            'low_24h': float(ticker_data.get('lowPrice') or 0),
-                            'volume_24h': float(ticker_data.get('volume') or 0),
-                            'is_mock': False
-                        }
+            if ticker_data:
+                price = float(ticker_data.get('lastPrice') or 0)
+                if price > 0:
+                    return {
+                        'symbol': symbol,
+                        'price': price,
+                        'change_24h': float(ticker_data.get('priceChangePercent') or 0),
+                        'high_24h': float(ticker_data.get('highPrice') or 0),
+                        'low_24h': float(ticker_data.get('lowPrice') or 0),
+                        'volume_24h': float(ticker_data.get('volume') or 0),
+                        'is_mock': False
+                    }
         except Exception as e:
             pass
 
@@ -219,13 +367,43 @@ class MarketDataProvider:
              if not self.using_fallback:
                 self._switch_to_fallback()
              if self.exchange:
-                 ticker = self.exchange.fetch_ticker(symbol)
+                 with self._ccxt_lock:
+                     ticker = self.exchange.fetch_ticker(symbol)
                  return self._format_ticker(ticker, symbol)
         except:
             pass
             
         return self._generate_mock_ticker(symbol)
 
+    async def get_tickers_async(self, symbols):
+        """
+        Fetches tickers for several symbols concurrently, {symbol: ticker}.
+        CCXT requests share one ccxt.async_support client seeded with the markets
+        already loaded here; symbols it can't serve go through get_ticker_info's
+        fallbacks (in threads). A symbol maps to the exception if that raised too.
+        """
+        tickers = {}
+        if self.exchange and not self.using_fallback:
+            import ccxt.async_support as ccxt_async # Imported on first use, it's slow to load
+            exchange = getattr(ccxt_async, self.exchange_id)(self._exchange_config)
+            try:
+                if self.exchange.markets:
+                    exchange.set_markets(self.exchange.markets, self.exchange.currencies)
+                results = await asyncio.gather(*[exchange.fetch_ticker(s) for s in symbols], return_exceptions=True)
+            finally:
+                await exchange.close()
+            for symbol, ticker in zip(symbols, results):
+                try:
+                    if not isinstance(ticker, BaseException):
+                        tickers[symbol] = self._format_ticker(ticker, symbol)
+                except:
+                    pass
+
+        rest = [s for s in symbols if s not in tickers]
+        results = await asyncio.gather(*[asyncio.to_thread(self.get_ticker_info, s) for s in rest], return_exceptions=True)
+        tickers.update(zip(rest, results))
+        return tickers
+
     def _format_ticker(self, ticker, symbol):
         return {
             'symbol': symbol,
@@ -272,61 +450,134 @@ class MarketDataProvider:
             base_price = 95000 if 'BTC' in symbol else 2500 if 'ETH' in symbol else 100
         
         # Generate random walk with trend regimes
-        prices = [base_price]
-        trend = 0
-        trend_duration = 0
+        # Trend changes every 50-150 periods; enough regimes are drawn to cover the whole walk
+        durations = np.random.randint(50, 150, size=limit // 50 + 1)
+        regimes = np.random.choice([-1, 0, 1], size=len(durations), p=[0.4, 0.2, 0.4]) # Bullish, Sideways, Bearish
+        trend = np.repeat(regimes, durations)[:limit]
+        
+        # Trend component + random component per step
+        changes = base_price * 0.001 * trend + np.random.normal(0, base_price * 0.003, size=limit)
+        
+        # Ensure price doesn't go negative: flooring each step at 10% of the base price
+        # is the same as lifting the free walk by its deepest dip below the floor so far
+        walk = base_price + np.concatenate(([0.0], np.cumsum(changes)))
+        floor = base_price * 0.1
+        prices = walk + np.maximum(np.maximum.accumulate(floor - walk), 0.0)
         
-        for i in range(limit):
-            # Change trend every 50-150 periods
-            if trend_duration <= 0:
-                trend = np.random.choice([-1, 0, 1], p=[0.4, 0.2, 0.4]) # Bullish, Sideways, Bearish
-                trend_duration = np.random.randint(50, 150)
-            
-            # Trend component
-            trend_move = base_price * 0.001 * trend
-            
-            # Random component
-            noise = np.random.normal(0, base_price * 0.003) 
-            
-            change = trend_move + noise
-            new_price = prices[-1] + change
-            
-            # Ensure price doesn't go negative
-            if new_price < base_price * 0.1: new_price = base_price * 0.1
-            
-            prices.append(new_price)
-            trend_duration -= 1
-            
-        data = []
         now = datetime.now()
         
-        # Timeframe delta approximation
-        delta = timedelta(hours=1)
-        if 'm' in timeframe: delta = timedelta(minutes=int(timeframe.replace('m','')))
-        elif 'd' in timeframe: delta = timedelta(days=1)
-        elif '4h' in timeframe: delta = timedelta(hours=4)
+        # Timeframe delta, hourly for anything not in the table
+        delta = _TF_DELTA.get(timeframe, timedelta(hours=1))
         
-        start_time = now - (delta * limit)
+        # Each candle opens at the previous close; wicks stick out by random noise
+        opens = prices[:-1]
+        closes = prices[1:]
+        wick = base_price * 0.002
+        highs = np.maximum(opens, closes) + np.abs(np.random.normal(0, wick, size=limit))
+        lows = np.minimum(opens, closes) - np.abs(np.random.normal(0, wick, size=limit))
         
-        for i in range(limit):
-            close = prices[i+1]
-            open_p = prices[i]
-            high = max(open_p, close) + abs(np.random.normal(0, base_price * 0.002))
-            low = min(open_p, close) - abs(np.random.normal(0, base_price * 0.002))
-            vol = np.random.randint(100, 1000)
-            
-            data.append({
-                'timestamp': start_time + (delta * i),
-                'open': open_p,
-                'high': high,
-                'low': low,
-                'close': close,
-                'volume': vol
-            })
-            
-        df = pd.DataFrame(data)
+        df = pd.DataFrame({
+            'timestamp': pd.date_range(start=now - (delta * limit), periods=limit, freq=delta),
+            'open': opens,
+            'high': highs,
+            'low': lows,
+            'close': closes,
+            'volume': np.random.randint(100, 1000, size=limit)
+        })
+        df.attrs['is_mock'] = True
         return df
 
+class TickerStream:
+    """
+    Streams live tickers over the exchange WebSocket (ccxt.pro) on a background
+    thread, so readers get the latest price from memory instead of polling REST.
+    Uses Binance (same liquidity source) since Tokocrypto has no ccxt.pro support.
+    A symbol stops streaming once it hasn't been watched for idle_timeout seconds.
+    """
+    def __init__(self, provider, exchange_id='binance', max_age=30, idle_timeout=300):
+        self.provider = provider
+        self.exchange_id = exchange_id
+        self.max_age = max_age # Seconds before a streamed ticker counts as stale
+        self.idle_timeout = idle_timeout
+        self.latest = {} # symbol -> (ticker, received at)
+        self._tasks = {} # symbol -> future of its watch loop
+        self._last_watched = {} # symbol -> last watch() call, on the monotonic clock
+        # One instance can be shared by several sessions (dashboard threads)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._exchange = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        atexit.register(self.close)
+
+    def watch(self, symbol):
+        """Starts streaming a symbol (no-op if it is already streaming) and stops idle ones"""
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return
+            self._last_watched[symbol] = now
+            if symbol not in self._tasks:
+                self._tasks[symbol] = asyncio.run_coroutine_threadsafe(self._watch_ticker(symbol), self._loop)
+            for other, last in list(self._last_watched.items()):
+                if now - last > self.idle_timeout:
+                    self._tasks.pop(other).cancel()
+                    del self._last_watched[other]
+                    self.latest.pop(other, None)
+
+    def get_ticker(self, symbol):
+        """Latest streamed ticker, or None if nothing fresh has arrived"""
+        entry = self.latest.get(symbol)
+        if entry is None or time.monotonic() - entry[1] > self.max_age:
+            return None
+        return entry[0]
+
+    def close(self):
+        """Stops every stream, closes the WebSocket client and the background loop"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            tasks = list(self._tasks.values())
+            self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_exchange(), self._loop).result(timeout=5)
+        except Exception as e:
+            print(Fore.YELLOW + f"[!] Ticker stream shutdown: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _close_exchange(self):
+        # Let the cancelled watch loops unsubscribe before the connection goes away
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.gather(*pending, return_exceptions=True)
+        if self._exchange is not None:
+            await self._exchange.close()
+
+    async def _watch_ticker(self, symbol):
+        if self._exchange is None:
+            import ccxt.pro as ccxtpro # Imported on first use, it's slow to load
+            self._exchange = getattr(ccxtpro, self.exchange_id)({'enableRateLimit': True})
+        try:
+            while True:
+                try:
+                    ticker = await self._exchange.watch_ticker(symbol)
+                    self.latest[symbol] = (self.provider._format_ticker(ticker, symbol), time.monotonic())
+                except ccxt.BadSymbol as e:
+                    # Retrying won't help; watch() restarts it once the symbol has been idle
+                    print(Fore.RED + f"[!] Ticker stream unavailable for {symbol}: {e}")
+                    return
+                except Exception as e:
+                    print(Fore.YELLOW + f"[!] Ticker stream error for {symbol}: {e}")
+                    await asyncio.sleep(10)
+        finally:
+            if self._exchange.has.get('unWatchTicker'):
+                try:
+                    await self._exchange.un_watch_ticker(symbol)
+                except Exception:
+                    pass
+
 if __name__ == "__main__":
     # Test
     provider = MarketDataProvider()
@@ -1,148 +1,241 @@
 
+import asyncio
 import csv
+import io
 import os
+import sys
+import numpy as np
+import pandas as pd
+from collections import defaultdict
 from colorama import Fore, Style
 from datetime import datetime
 from src.market_data import MarketDataProvider
+from src.jit import njit
+
+# Fill side codes for replay_fills
+FILL_BUY = 1
+FILL_SELL = 2
+
+@njit(cache=True)
+def replay_fills(symbol_ids, sides, amounts, prices, n_symbols):
+    """
+    Runs fills through the weighted average cost book, in log order and with the
+    same arithmetic as the report's row loop.
+    Returns (realized PnL per SELL, total realized PnL, qty and cost basis per symbol).
+    """
+    qty = np.zeros(n_symbols)
+    cost_basis = np.zeros(n_symbols)
+    pnl = np.empty(len(sides))
+    n_sells = 0
+    total_pnl = 0.0
+    for i in range(len(sides)):
+        s = symbol_ids[i]
+        amount = amounts[i]
+        price = prices[i]
+        if sides[i] == FILL_BUY:
+            current_val = qty[s] * cost_basis[s]
+            new_val = amount * price
+            total_qty = qty[s] + amount
+            if total_qty > 0:
+                cost_basis[s] = (current_val + new_val) / total_qty
+            qty[s] = total_qty
+        elif sides[i] == FILL_SELL:
+            realized_pnl = (price - cost_basis[s]) * amount
+            pnl[n_sells] = realized_pnl
+            n_sells += 1
+            total_pnl += realized_pnl
+            qty[s] -= amount
+            if qty[s] < 0:
+                qty[s] = 0.0
+    return pnl[:n_sells], total_pnl, qty, cost_basis
 
 class TradeReporter:
     def __init__(self, history_file='paper_trade_history.csv'):
         self.history_file = history_file
 
-    def generate_report(self):
+    def generate_report(self, show_trades=True):
+        """
+        Prints the trade history, open positions with floating PnL and realized stats.
+        With show_trades=False the per-trade table is skipped and the history is
+        summarized in one batch pass instead of row by row.
+        """
         if not os.path.exists(self.history_file):
             print(Fore.RED + f"[!] History file '{self.history_file}' not found.")
             return
 
-        print(Fore.CYAN + "\n==========================================================================================")
-        print(Fore.CYAN + "                                PAPER TRADE HISTORY ANALYSIS                               ")
-        print(Fore.CYAN + "==========================================================================================")
-        
-        # Header
-        print(f"{'TIMESTAMP':<20} | {'SIDE':<4} | {'PRICE':<12} | {'AMOUNT':<10} | {'VALUE':<10} | {'PnL (USDT)':<12} | {'PnL (%)':<8}")
-        print("-" * 90)
-
-        rows = []
-        try:
-            with open(self.history_file, 'r') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-        except Exception as e:
-            print(Fore.RED + f"Error reading history: {e}")
-            return
+        # The report is built in memory and written out in one go instead of a
+        # print per row. Each line ends with a colour reset, like autoreset does.
+        GREEN, RED, RESET = Fore.GREEN, Fore.RED, Style.RESET_ALL
+        END = RESET + "\n"
+        out = io.StringIO()
+        write = out.write
 
-        portfolio = {} # { 'BTC/USDT': {'qty': 0.0, 'cost_basis': 0.0} }
+        # Row templates are built once per report; BUY and SELL rows get the side
+        # cell (and a BUY row's empty PnL cells) baked in
+        row_tail = " | {:<12,.2f} | {:<10.5f} | {:<10,.2f} | "
+        buy_row = ("{:<20} | " + GREEN + "BUY " + RESET + row_tail + f"{'-':<12} | {'-':<8}" + END).format
+        sell_row = ("{:<20} | " + RED + "SELL" + RESET + row_tail + "{:<12} | {:<8}" + END).format
+        other_row = ("{:<20} | {}{:<4}" + RESET + row_tail + f"{'-':<12} | {'-':<8}" + END).format
+
+        write(Fore.CYAN + "\n==========================================================================================" + END)
+        write(Fore.CYAN + "                                PAPER TRADE HISTORY ANALYSIS                               " + END)
+        write(Fore.CYAN + "==========================================================================================" + END)
         
-        total_pnl = 0.0
-        win_count = 0
-        loss_count = 0
-        trade_count = 0
+        if not show_trades:
+            try:
+                portfolio, trade_count, total_pnl, win_count, loss_count = self._summarize_history()
+            except Exception as e:
+                sys.stdout.write(out.getvalue())
+                print(Fore.RED + f"Error reading history: {e}")
+                return
+        else:
+            # Header
+            write(f"{'TIMESTAMP':<20} | {'SIDE':<4} | {'PRICE':<12} | {'AMOUNT':<10} | {'VALUE':<10} | {'PnL (USDT)':<12} | {'PnL (%)':<8}{END}")
+            write("-" * 90 + END)
 
-        for row in rows:
             try:
-                ts = row['Timestamp']
-                symbol = row['Symbol']
-                side = row['Type'].upper()
-                amount = float(row['Amount'])
-                price = float(row['Price'])
-                
-                # Handle potential float conversion issues or missing keys
-                
-                if symbol not in portfolio:
-                    portfolio[symbol] = {'qty': 0.0, 'cost_basis': 0.0}
-                
-                pos = portfolio[symbol]
+                f = open(self.history_file, 'r', newline='')
+            except Exception as e:
+                sys.stdout.write(out.getvalue())
+                print(Fore.RED + f"Error reading history: {e}")
+                return
+
+            portfolio = defaultdict(lambda: {'qty': 0.0, 'cost_basis': 0.0}) # { 'BTC/USDT': {'qty': 0.0, 'cost_basis': 0.0} }
+        
+            total_pnl = 0.0
+            win_count = 0
+            loss_count = 0
+            trade_count = 0
+
+            # Single streaming pass: rows are printed and folded into the portfolio as they're read
+            with f:
+                reader = csv.reader(f)
+                next(reader, None) # Header
+                for row in reader:
+                    try:
+                        # Timestamp, Symbol, Type, Amount, Price, Value (USDT), Balance (USDT)
+                        ts, symbol, side, amount, price, *_ = row
+                        side = side.upper()
+                        amount = float(amount)
+                        price = float(price)
                 
-                pnl_str = "-"
-                pnl_pct_str = "-"
+                        pos = portfolio[symbol]
                 
-                if side == 'BUY':
-                    # Weighted Average Cost Basis
-                    current_val = pos['qty'] * pos['cost_basis']
-                    new_val = amount * price
-                    total_qty = pos['qty'] + amount
+                        if side == 'BUY':
+                            # Weighted Average Cost Basis
+                            current_val = pos['qty'] * pos['cost_basis']
+                            new_val = amount * price
+                            total_qty = pos['qty'] + amount
                     
-                    if total_qty > 0:
-                        pos['cost_basis'] = (current_val + new_val) / total_qty
+                            if total_qty > 0:
+                                pos['cost_basis'] = (current_val + new_val) / total_qty
                     
-                    pos['qty'] = total_qty
+                            pos['qty'] = total_qty
                     
-                    side_color = Fore.GREEN
+                            side_color = GREEN
+                            write(buy_row(ts, price, amount, amount*price))
                     
-                elif side == 'SELL':
-                    trade_count += 1
-                    avg_cost = pos['cost_basis']
+                        elif side == 'SELL':
+                            trade_count += 1
+                            avg_cost = pos['cost_basis']
                     
-                    # PnL Calculation
-                    realized_pnl = (price - avg_cost) * amount
-                    pnl_pct = ((price - avg_cost) / avg_cost) * 100 if avg_cost > 0 else 0.0
+                            # PnL Calculation
+                            realized_pnl = (price - avg_cost) * amount
+                            pnl_pct = ((price - avg_cost) / avg_cost) * 100 if avg_cost > 0 else 0.0
                     
-                    total_pnl += realized_pnl
-                    if realized_pnl > 0: win_count += 1
-                    else: loss_count += 1
+                            total_pnl += realized_pnl
+                            if realized_pnl > 0: win_count += 1
+                            else: loss_count += 1
                     
-                    pos['qty'] -= amount
-                    if pos['qty'] < 0: pos['qty'] = 0
+                            pos['qty'] -= amount
+                            if pos['qty'] < 0: pos['qty'] = 0
                     
-                    # Formatting
-                    color = Fore.GREEN if realized_pnl >= 0 else Fore.RED
-                    pnl_str = f"{color}{realized_pnl:+,.2f}{Style.RESET_ALL}"
-                    pnl_pct_str = f"{color}{pnl_pct:+,.2f}%{Style.RESET_ALL}"
-                    side_color = Fore.RED
+                            # Formatting
+                            color = GREEN if realized_pnl >= 0 else RED
+                            pnl_str = f"{color}{realized_pnl:+,.2f}{RESET}"
+                            pnl_pct_str = f"{color}{pnl_pct:+,.2f}%{RESET}"
+                            side_color = RED
+                            write(sell_row(ts, price, amount, amount*price, pnl_str, pnl_pct_str))
 
-                print(f"{ts:<20} | {side_color}{side:<4}{Style.RESET_ALL} | {price:<12,.2f} | {amount:<10.5f} | {amount*price:<10,.2f} | {pnl_str:<12} | {pnl_pct_str:<8}")
+                        else:
+                            write(other_row(ts, side_color, side, price, amount, amount*price))
 
-            except KeyError as e:
-                continue # Skip malformed rows
-            except ValueError:
-                continue
+                    except ValueError:
+                        continue # Skip malformed rows (too few fields or bad numbers)
 
-        print("-" * 90)
+            write("-" * 90 + END)
         
         # --- Floating PnL Calculation ---
-        print(Fore.YELLOW + "\n[OPEN POSITIONS & FLOATING PnL]")
+        write(Fore.YELLOW + "\n[OPEN POSITIONS & FLOATING PnL]" + END)
+        
+        # Open positions are collected first so their prices are fetched together
+        open_positions = [(symbol, pos) for symbol, pos in portfolio.items() if pos['qty'] > 0.00000001] # Filter tiny dust
         
-        market = None
-        has_open_positions = False
+        if open_positions:
+            write(Fore.WHITE + "[*] Fetching live market prices..." + END)
+            # Show the history before waiting on the network (the provider prints too)
+            sys.stdout.write(out.getvalue())
+            out = io.StringIO()
+            write = out.write
+            market = MarketDataProvider()
+            tickers = asyncio.run(market.get_tickers_async([symbol for symbol, _ in open_positions]))
         
-        for symbol, pos in portfolio.items():
-            if pos['qty'] > 0.00000001: # Filter tiny dust
-                has_open_positions = True
+        for symbol, pos in open_positions:
+            try:
+                ticker = tickers[symbol]
+                if isinstance(ticker, BaseException):
+                    raise ticker
+                current_price = ticker['price']
                 
-                # Lazy Init Market Data
-                if market is None:
-                    print(Fore.WHITE + "[*] Fetching live market prices...")
-                    market = MarketDataProvider()
+                avg_cost = pos['cost_basis']
+                qty = pos['qty']
+                value_now = qty * current_price
+                cost_basis_total = qty * avg_cost
                 
-                try:
-                    ticker = market.get_ticker_info(symbol)
-                    current_price = ticker['price']
-                    
-                    avg_cost = pos['cost_basis']
-                    qty = pos['qty']
-                    value_now = qty * current_price
-                    cost_basis_total = qty * avg_cost
-                    
-                    unrealized_pnl = value_now - cost_basis_total
-                    unrealized_pnl_pct = ((current_price - avg_cost) / avg_cost) * 100 if avg_cost > 0 else 0
-                    
-                    color = Fore.GREEN if unrealized_pnl >= 0 else Fore.RED
-                    
-                    print(f"• {symbol:<10} | Qty: {qty:.5f} | Avg Cost: {avg_cost:,.2f} | Current: {current_price:,.2f}")
-                    print(f"  Floating PnL: {color}${unrealized_pnl:+,.2f} ({unrealized_pnl_pct:+,.2f}%){Style.RESET_ALL}")
-                    
-                except Exception as e:
-                    print(Fore.RED + f"• {symbol}: Failed to fetch price ({e})")
+                unrealized_pnl = value_now - cost_basis_total
+                unrealized_pnl_pct = ((current_price - avg_cost) / avg_cost) * 100 if avg_cost > 0 else 0
+                
+                color = GREEN if unrealized_pnl >= 0 else RED
+                
+                write(f"• {symbol:<10} | Qty: {qty:.5f} | Avg Cost: {avg_cost:,.2f} | Current: {current_price:,.2f}{END}")
+                write(f"  Floating PnL: {color}${unrealized_pnl:+,.2f} ({unrealized_pnl_pct:+,.2f}%){RESET}{END}")
+                
+            except Exception as e:
+                write(RED + f"• {symbol}: Failed to fetch price ({e})" + END)
         
-        if not has_open_positions:
-            print("No open positions.")
+        if not open_positions:
+            write("No open positions." + END)
         
         # Summary
-        print(Fore.YELLOW + "\n[SUMMARY STATISTICS (REALIZED)]")
-        print(f"• Total Trades (Sell): {trade_count}")
-        print(f"• Win/Loss           : {win_count}W - {loss_count}L")
-        print(f"• Realized PnL       : {Fore.GREEN if total_pnl >= 0 else Fore.RED}${total_pnl:,.2f}{Style.RESET_ALL}")
-        print("==========================================================================================\n")
+        write(Fore.YELLOW + "\n[SUMMARY STATISTICS (REALIZED)]" + END)
+        write(f"• Total Trades (Sell): {trade_count}{END}")
+        write(f"• Win/Loss           : {win_count}W - {loss_count}L{END}")
+        write(f"• Realized PnL       : {GREEN if total_pnl >= 0 else RED}${total_pnl:,.2f}{RESET}{END}")
+        write("==========================================================================================\n" + END)
+        sys.stdout.write(out.getvalue())
+
+    def _summarize_history(self):
+        """
+        Summary-only pass over the history: parsed by pandas and replayed in one
+        replay_fills call. Returns (portfolio, trade_count, total_pnl, win_count, loss_count).
+        """
+        # round_trip keeps floats identical to float(); malformed rows are dropped
+        history = pd.read_csv(self.history_file, usecols=['Symbol', 'Type', 'Amount', 'Price'], dtype={'Symbol': str, 'Type': str},
+                              float_precision='round_trip', on_bad_lines='skip')
+        amounts = pd.to_numeric(history['Amount'], errors='coerce')
+        prices = pd.to_numeric(history['Price'], errors='coerce')
+        valid = history['Symbol'].notna() & history['Type'].notna() & amounts.notna() & prices.notna()
+        history = history[valid]
+
+        symbol_ids, symbols = pd.factorize(history['Symbol'])
+        types = history['Type'].str.upper().to_numpy()
+        sides = np.where(types == 'BUY', FILL_BUY, np.where(types == 'SELL', FILL_SELL, 0))
+        pnl, total_pnl, qty, cost_basis = replay_fills(symbol_ids, sides, amounts[valid].to_numpy(np.float64),
+                                                       prices[valid].to_numpy(np.float64), len(symbols))
+
+        portfolio = {symbol: {'qty': q, 'cost_basis': c} for symbol, q, c in zip(symbols, qty.tolist(), cost_basis.tolist())}
+        win_count = int((pnl > 0).sum())
+        return portfolio, len(pnl), total_pnl, win_count, len(pnl) - win_count
 
 
 if __name__ == "__main__":
@@ -1,29 +1,127 @@
 import requests
+import json
+import os
+import time
 import pandas as pd
 from colorama import Fore, Style
 from datetime import datetime
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from src.fastjson import loads
+from src.http_client import RETRY_SESSION
+
+# Longest wait for the index, per request and for a pending prefetch
+FNG_TIMEOUT = 5
+# Default cache file, next to the indicator cache rather than in the working directory
+FNG_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'tradecrypto', 'fng.json')
 
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, fng_ttl=3600, cache_file=FNG_CACHE_FILE):
         self.fng_api_url = "https://api.alternative.me/fng/"
-        
+        # Shared keep-alive session so repeated fetches reuse the TLS connection.
+        # It retries only 5xx responses, never 429s, timeouts or connection errors.
+        self.session = RETRY_SESSION
+        # The index is published once a day, so a fetched value is reused for
+        # fng_ttl seconds, and across runs through cache_file (None to disable)
+        self.fng_ttl = fng_ttl
+        self.cache_file = cache_file
+        self._fng_cache = None
+        self._fng_cache_time = 0.0
+        self._load_fng_cache()
+        # The fetch runs in the background from construction (and each prefetch),
+        # so it overlaps whatever the caller does before it needs the value.
+        # Its thread is a daemon, so exiting never waits on an in-flight fetch.
+        self._fng_future = None
+        self.prefetch()
+        # Inputs and result of the last analyze_market_sentiment call
+        self._last_sentiment_key = None
+        self._last_sentiment = None
+
+    def _load_fng_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file) as f:
+                cached = json.load(f)
+            self._fng_cache = {
+                'value': int(cached['value']),
+                'classification': cached['classification'],
+                'timestamp': int(cached['timestamp'])
+            }
+            self._fng_cache_time = float(cached['fetched_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_fng_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+            tmp_path = self.cache_file + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(dict(self._fng_cache, fetched_at=self._fng_cache_time), f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            pass
+
+    def _fng_cache_fresh(self):
+        return self._fng_cache is not None and time.time() - self._fng_cache_time < self.fng_ttl
+
+    def prefetch(self):
+        """
+        Starts fetching the Fear & Greed Index in the background, unless a fresh
+        value is cached or a fetch is already running.
+        """
+        if self._fng_cache_fresh() or (self._fng_future is not None and not self._fng_future.done()):
+            return
+        future = Future()
+
+        def fetch():
+            try:
+                future.set_result(self._fetch_fear_and_greed_index())
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=fetch, name='fng-prefetch', daemon=True).start()
+        self._fng_future = future
+
     def get_fear_and_greed_index(self):
         """
         Fetches the Crypto Fear & Greed Index from alternative.me
         Returns a dictionary with value and classification.
+        Waits (up to FNG_TIMEOUT seconds) for a prefetch if one was started
+        rather than requesting again.
         """
+        if self._fng_cache_fresh():
+            return dict(self._fng_cache)
+        future, self._fng_future = self._fng_future, None
+        if future is not None:
+            try:
+                return future.result(timeout=FNG_TIMEOUT)
+            except FutureTimeoutError:
+                # Left running (and tracked) so a later call can still use it
+                self._fng_future = future
+                print(Fore.YELLOW + f"[!] Warning: Sentiment API too slow. Using Neutral default.")
+                return self._fallback_fng()
+        return self._fetch_fear_and_greed_index()
+
+    def _fetch_fear_and_greed_index(self):
         try:
-            # Short timeout to avoid blocking execution for too long
-            response = requests.get(self.fng_api_url, timeout=5)
+            # Short timeout to avoid blocking execution for too long (timeouts
+            # aren't retried by the session, so this bounds a failed attempt)
+            response = self.session.get(self.fng_api_url, timeout=FNG_TIMEOUT)
             if response.status_code == 200:
-                data = response.json()
+                data = loads(response.content)
                 if 'data' in data and len(data['data']) > 0:
                     item = data['data'][0]
-                    return {
+                    self._fng_cache = {
                         'value': int(item['value']),
                         'classification': item['value_classification'],
                         'timestamp': int(item['timestamp'])
                     }
+                    self._fng_cache_time = time.time()
+                    self._save_fng_cache()
+                    return dict(self._fng_cache)
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.RequestException):
             # Suppress noisy stack trace for common connection errors (DNS block/Timeout)
             print(Fore.YELLOW + f"[!] Warning: Cannot reach Sentiment API (DNS Block/Offline). Using Neutral default.")
@@ -31,7 +129,10 @@ class SentimentAnalyzer:
             # Catch other unexpected errors
             print(Fore.YELLOW + f"[!] Sentiment API Error: {str(e)[:50]}... Using default.")
             
-        # Fallback
+        return self._fallback_fng()
+
+    @staticmethod
+    def _fallback_fng():
         return {
             'value': 50,
             'classification': "Neutral (Fallback)",
@@ -42,9 +143,24 @@ class SentimentAnalyzer:
         """
         Combines Fear & Greed Index with Technical Metrics to give a 
         comprehensive AI Sentiment Score.
+        Repeated calls with the same inputs (e.g. two observers refreshing on
+        the same tick) reuse the previous result; each caller gets its own copy.
         """
         # 1. Global Market Sentiment (Social/News Proxy)
         fng = self.get_fear_and_greed_index()
+
+        # Everything the scoring below reads, compared exactly
+        key = (fng['value'], fng['classification'], fng['timestamp'])
+        if technical_metrics:
+            key += (
+                technical_metrics.get('trend_direction', 'Sideways'),
+                technical_metrics.get('trend_strength', 'Weak'),
+                technical_metrics.get('rsi', 50),
+                technical_metrics.get('volume', 0),
+                technical_metrics.get('vol_sma', 0)
+            )
+        if key == self._last_sentiment_key:
+            return self._copy_sentiment(self._last_sentiment)
         
         # 2. Technical Sentiment (Asset Specific)
         tech_score = 50 # Default Neutral
@@ -114,7 +230,7 @@ class SentimentAnalyzer:
         elif composite_score <= 25: sentiment_label = "EXTREME BEARISH"
         elif composite_score <= 40: sentiment_label = "BEARISH"
         
-        return {
+        result = {
             'global_sentiment': {
                 'value': fng['value'],
                 'classification': f"{fng['classification']} (Market-Wide)",
@@ -132,6 +248,14 @@ class SentimentAnalyzer:
             'composite_label': sentiment_label,
             'summary': f"Global: {fng['classification']}, Local: {local_sentiment}, Tech: {tech_sentiment}."
         }
+        self._last_sentiment_key = key
+        self._last_sentiment = result
+        return self._copy_sentiment(result)
+
+    @staticmethod
+    def _copy_sentiment(result):
+        # The result is one level of nested dicts, so this fully detaches it
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in result.items()}
 
 if __name__ == "__main__":
     analyzer = SentimentAnalyzer()
@@ -1,8 +1,34 @@
 import numpy as np
+from src.jit import njit
+
+# Numeric codes for analyze_bar, mirroring the labels SignalEngine works with
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = 2
+
+TREND_SIDEWAYS = 0
+TREND_BULLISH = 1
+TREND_BEARISH = 2
+
+STRENGTH_WEAK = 0
+STRENGTH_MEDIUM = 1
+STRENGTH_STRONG = 2
+STRENGTH_VERY_STRONG = 3
+
+# Factor strings that only vary with the trend strength label, built once
+TREND_FOLLOWING_FACTORS = {s: f"Strategy: Trend Following ({s} Trend)" for s in ("Medium", "Strong", "Very Strong")}
+TREND_BONUS_FACTORS = {s: f"{s} Trend Bonus" for s in ("Strong", "Very Strong")}
+
+# Probability bins of analyze_batch and their signals
+BATCH_SIGNAL_EDGES = np.array([25, 74], dtype=np.int16)
+BATCH_SIGNAL_LABELS = np.array(['SELL', 'HOLD', 'BUY'])
 
 class SignalEngine:
-    def __init__(self, metrics):
+    def __init__(self, metrics, explain=False):
         self.metrics = metrics
+        # Factor strings are only built when asked for; without them
+        # analyze() is pure scoring and 'factors' comes back empty
+        self.explain = explain
 
     def analyze(self):
         """
@@ -10,31 +36,31 @@ class SignalEngine:
         """
         score = 0
         factors = []
+        explain = self.explain
+        # Each metric is read once
+        metrics = self.metrics
+        close = metrics['close']
+        ema_50 = metrics.get('ema_50')
+        ema_200 = metrics.get('ema_200')
+        trend_direction = metrics['trend_direction']
+        trend_strength = metrics.get('trend_strength', 'Weak')
         
         # 1. Trend Analysis (Weight: 40%)
         # Refined: Price vs EMA50 is faster than EMA crossover
-        ema_50 = self.metrics.get('ema_50')
-        close = self.metrics['close']
-        
-        if self.metrics['trend_direction'] == 'Bullish':
+        if trend_direction == 'Bullish':
             score += 15
-            factors.append("Bullish Trend (EMA50 > EMA200)")
+            if explain: factors.append("Bullish Trend (EMA50 > EMA200)")
             # Stronger confirmation if price is above EMA50
             if ema_50 and close > ema_50:
                 score += 10
-                factors.append("Price above EMA50 (Strong Momentum)")
-        elif self.metrics['trend_direction'] == 'Bearish':
+                if explain: factors.append("Price above EMA50 (Strong Momentum)")
+        elif trend_direction == 'Bearish':
             score -= 15
-            factors.append("Bearish Trend (EMA50 < EMA200)")
+            if explain: factors.append("Bearish Trend (EMA50 < EMA200)")
             # Stronger confirmation if price is below EMA50
             if ema_50 and close < ema_50:
                 score -= 10
-                factors.append("Price below EMA50 (Strong Momentum)")
-        
-        # Trend Strength Filter (ADX)
-        trend_strength = self.metrics.get('trend_strength', 'Weak')
-        ema_200 = self.metrics.get('ema_200')
-        close = self.metrics['close']
+                if explain: factors.append("Price below EMA50 (Strong Momentum)")
         
         # MARKET REGIME FILTER (Higher Timeframe Bias)
         is_bull_regime = False
@@ -49,119 +75,117 @@ class SignalEngine:
         
         if trend_strength == "Weak": # ADX < 25
             # --- NO TRADE ZONE (Sideways Market) ---
-            factors.append("Strategy: HOLD (Sideways/Weak Trend)")
+            if explain: factors.append("Strategy: HOLD (Sideways/Weak Trend)")
             score = 0 # Force Neutral Score
             # We skip all Mean Reversion logic to protect capital in choppy markets
-            factors.append("Action: Waiting for clearer trend (ADX > 25)")
+            if explain: factors.append("Action: Waiting for clearer trend (ADX > 25)")
 
         else:
             # --- TREND FOLLOWING STRATEGY ---
-            factors.append(f"Strategy: Trend Following ({trend_strength} Trend)")
+            if explain: factors.append(TREND_FOLLOWING_FACTORS.get(trend_strength) or f"Strategy: Trend Following ({trend_strength} Trend)")
             
             # EMA200 Filter: Only take trades in direction of major trend
             if is_bull_regime:
                 if score > 0: score += 15 # Boost Buy Signal
                 elif score < 0: score = 0 # Kill sell signals
-                factors.append("Bullish Regime (Price > EMA200)")
+                if explain: factors.append("Bullish Regime (Price > EMA200)")
             elif is_bear_regime:
                 if score < 0: score -= 15 # Boost Sell Signal
                 elif score > 0: score = 0 # Kill buy signals
-                factors.append("Bearish Regime (Price < EMA200)")
+                if explain: factors.append("Bearish Regime (Price < EMA200)")
 
             if trend_strength in ["Strong", "Very Strong"]:
                 if score > 0: score += 10
                 elif score < 0: score -= 10
-                factors.append(f"{trend_strength} Trend Bonus")
+                if explain: factors.append(TREND_BONUS_FACTORS[trend_strength])
 
             # 2. Momentum Analysis - RSI (Trend Following Mode)
-            rsi = self.metrics['rsi']
+            rsi = metrics['rsi']
             
             # RSI Logic Adjusted for Trend Strength
             if is_bull_regime:
                 if rsi < 40: # Dip Buy opportunity
                     score += 20
-                    factors.append(f"RSI Dip in Bull Trend ({rsi:.2f})")
+                    if explain: factors.append(f"RSI Dip in Bull Trend ({rsi:.2f})")
                 elif rsi > 70:
                     if trend_strength == "Very Strong":
                         score += 5 # Super Bullish Momentum
-                        factors.append("RSI Overbought (Ignored - Super Trend)")
+                        if explain: factors.append("RSI Overbought (Ignored - Super Trend)")
                     else:
                         score -= 10 # Normal Overbought Caution
-                        factors.append(f"RSI Overbought ({rsi:.2f})")
+                        if explain: factors.append(f"RSI Overbought ({rsi:.2f})")
                 elif rsi > 50:
                     score += 10 # Bullish Momentum
             
             elif is_bear_regime:
                 if rsi > 60: # Rip Sell opportunity
                     score -= 20
-                    factors.append(f"RSI Spike in Bear Trend ({rsi:.2f})")
+                    if explain: factors.append(f"RSI Spike in Bear Trend ({rsi:.2f})")
                 elif rsi < 30:
                     if trend_strength == "Very Strong":
                         score -= 5 # Super Bearish Momentum
-                        factors.append("RSI Oversold (Ignored - Super Trend)")
+                        if explain: factors.append("RSI Oversold (Ignored - Super Trend)")
                     else:
                         score += 10 # Normal Oversold Caution
-                        factors.append(f"RSI Oversold ({rsi:.2f})")
+                        if explain: factors.append(f"RSI Oversold ({rsi:.2f})")
                 elif rsi < 50:
                     score -= 10 # Bearish Momentum
 
-        # 3. MACD Analysis (Weight: 20%)
-
         # 3. MACD Analysis (Weight: 20%)
         # Check histogram direction
-        if self.metrics['macd_hist'] > 0:
+        if metrics['macd_hist'] > 0:
             score += 10
-            factors.append("MACD Histogram Positive")
+            if explain: factors.append("MACD Histogram Positive")
         else:
             score -= 10
-            factors.append("MACD Histogram Negative")
+            if explain: factors.append("MACD Histogram Negative")
 
         # 4. Price Action vs Support/Resistance (Weight: 20%)
-        close = self.metrics['close']
-        support = self.metrics['support']
-        resistance = self.metrics['resistance']
+        support = metrics['support']
+        resistance = metrics['resistance']
         
         # If close to support (within 1% range), potential bounce (Bullish)
         if support and close <= support * 1.01:
             score += 15
-            factors.append("Price near Support Level")
+            if explain: factors.append("Price near Support Level")
         # If close to resistance (within 1% range), potential rejection (Bearish)
         if resistance and close >= resistance * 0.99:
             score -= 15
-            factors.append("Price near Resistance Level")
+            if explain: factors.append("Price near Resistance Level")
 
         # 5. Volume/Sentiment Analysis (Weight: 20%)
         # Enhanced with Local Sentiment Logic (Volume Anomalies)
-        if self.metrics.get('volume') and self.metrics.get('vol_sma'):
-            vol_sma = self.metrics['vol_sma']
+        volume = metrics.get('volume')
+        vol_sma = metrics.get('vol_sma')
+        if volume and vol_sma:
             if vol_sma > 0:
-                vol_ratio = self.metrics['volume'] / vol_sma
+                vol_ratio = volume / vol_sma
                 
                 # Volume Spike Logic
                 if vol_ratio > 2.0:
                     # Extreme Volume -> Strong Confirmation
                     if score > 0:
                         score += 20
-                        factors.append(f"Extreme Volume Spike ({vol_ratio:.1f}x) - Bullish")
+                        if explain: factors.append(f"Extreme Volume Spike ({vol_ratio:.1f}x) - Bullish")
                     elif score < 0:
                         score -= 20
-                        factors.append(f"Extreme Volume Spike ({vol_ratio:.1f}x) - Bearish")
+                        if explain: factors.append(f"Extreme Volume Spike ({vol_ratio:.1f}x) - Bearish")
                 elif vol_ratio > 1.2:
                     # High Volume -> Moderate Confirmation
                     if score > 0:
                         score += 10
-                        factors.append(f"High Volume ({vol_ratio:.1f}x) - Bullish")
+                        if explain: factors.append(f"High Volume ({vol_ratio:.1f}x) - Bullish")
                     elif score < 0:
                         score -= 10
-                        factors.append(f"High Volume ({vol_ratio:.1f}x) - Bearish")
+                        if explain: factors.append(f"High Volume ({vol_ratio:.1f}x) - Bearish")
                 elif vol_ratio < 0.6:
                     # Low Volume -> Weakens the signal
                     if score > 0:
                         score -= 5
-                        factors.append("Low Volume (Weakens Bullish Signal)")
+                        if explain: factors.append("Low Volume (Weakens Bullish Signal)")
                     elif score < 0:
                         score += 5
-                        factors.append("Low Volume (Weakens Bearish Signal)")
+                        if explain: factors.append("Low Volume (Weakens Bearish Signal)")
 
         # Normalize Score to Probability (0-100)
         # Base score is 50 (Neutral). Range approx -75 to +75 added to 50.
@@ -193,6 +217,98 @@ class SignalEngine:
             'factors': factors
         }
 
+    @staticmethod
+    def analyze_batch(df):
+        """
+        Vectorized analyze() over every row of an add_all_indicators() frame,
+        with trend direction/strength derived per row as get_latest_metrics
+        does. Returns a dict of arrays: 'signal' (labels), 'probability' and
+        'confidence'; factors are not built. Row i matches analyze() on the
+        metrics of candle i.
+        """
+        def column(name):
+            values = df[name].to_numpy()
+            if values.dtype == object:
+                # An indicator with too little history is a column of None,
+                # which is falsy where NaN is truthy
+                present = values != None
+                values = np.where(present, values, np.nan).astype(float)
+                return values, present & (values != 0)
+            values = values.astype(float, copy=False)
+            return values, values != 0
+
+        close = df['close'].to_numpy(dtype=float)
+        ema_50, ema_50_set = column('EMA_50')
+        ema_200, ema_200_set = column('EMA_200')
+        rsi = df['RSI'].to_numpy(dtype=float)
+        macd_hist = df['MACDh_12_26_9'].to_numpy(dtype=float)
+        support, support_set = column('Support_Dynamic')
+        resistance, resistance_set = column('Resistance_Dynamic')
+        volume, volume_set = column('volume')
+        vol_sma, vol_sma_set = column('VOL_SMA_20')
+        adx = df['ADX_14'].to_numpy(dtype=float) if 'ADX_14' in df.columns else np.full(len(close), np.nan)
+
+        def points(mask, value, other=0):
+            return np.where(mask, np.int16(value), np.int16(other))
+
+        # Scores stay well within +/-200, so they are summed as int16
+        # arrays rather than int64 ones (a quarter of the memory traffic)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Trend labels as in get_latest_metrics (comparisons with NaN are False)
+            has_trend = (ema_50 == ema_50) & (ema_200 == ema_200)
+            bullish = has_trend & (ema_50 > ema_200)
+            bearish = has_trend & ~(ema_50 > ema_200)
+            weak = ~(adx > 20)
+            strong = adx > 25
+            very_strong = adx > 50
+
+            # 1. Trend Analysis
+            score = points(bullish, 15) - points(bearish, 15)
+            score += points(bullish & ema_50_set & (close > ema_50), 10)
+            score -= points(bearish & ema_50_set & (close < ema_50), 10)
+
+            # MARKET REGIME FILTER (Higher Timeframe Bias)
+            bull_regime = ema_200_set & (close > ema_200)
+            bear_regime = ema_200_set & ~(close > ema_200)
+
+            # --- TREND FOLLOWING STRATEGY --- (Weak trends are zeroed below)
+            score = np.where(bull_regime, np.where(score > 0, score + 15, np.int16(0)), score)
+            score = np.where(bear_regime, np.where(score < 0, score - 15, np.int16(0)), score)
+            score += np.where(strong, np.sign(score) * np.int16(10), np.int16(0))
+
+            # 2. Momentum Analysis - RSI (Trend Following Mode)
+            score += np.where(bull_regime, np.select(
+                [rsi < 40, rsi > 70, rsi > 50],
+                [np.int16(20), points(very_strong, 5, -10), np.int16(10)], np.int16(0)), np.int16(0))
+            score += np.where(bear_regime, np.select(
+                [rsi > 60, rsi < 30, rsi < 50],
+                [np.int16(-20), points(very_strong, -5, 10), np.int16(-10)], np.int16(0)), np.int16(0))
+
+            # --- NO TRADE ZONE (Sideways Market) ---
+            score = np.where(weak, np.int16(0), score)
+
+            # 3. MACD Analysis
+            score += points(macd_hist > 0, 10, -10)
+
+            # 4. Price Action vs Support/Resistance
+            score += points(support_set & (close <= support * 1.01), 15)
+            score -= points(resistance_set & (close >= resistance * 0.99), 15)
+
+            # 5. Volume/Sentiment Analysis
+            vol_ratio = np.where(volume_set & vol_sma_set & (vol_sma > 0), volume / vol_sma, np.nan)
+            score += np.sign(score) * np.select(
+                [vol_ratio > 2.0, vol_ratio > 1.2, vol_ratio < 0.6],
+                [np.int16(20), np.int16(10), np.int16(-5)], np.int16(0))
+
+        probability = np.clip(score + 50, 0, 100)
+        # <= 25 SELL, 26..74 HOLD, >= 75 BUY
+        signal = BATCH_SIGNAL_LABELS[np.searchsorted(BATCH_SIGNAL_EDGES, probability)]
+        return {
+            'signal': signal,
+            'probability': probability,
+            'confidence': np.abs(probability - 50) * 2
+        }
+
     def calculate_entry_exit(self, signal, price, atr):
         """
         Calculates SL and TP based on ATR and Trend Strength.
@@ -223,3 +339,116 @@ class SignalEngine:
             return {'entry': price, 'sl': sl, 'tp': tp}
         else:
             return {'entry': price, 'sl': 0, 'tp': 0}
+
+@njit(cache=True)
+def analyze_bar(close, rsi, macd_hist, ema_50, ema_200, atr, trend_dir, trend_str,
+                support, resistance, volume, vol_sma):
+    """
+    Scalar port of SignalEngine.analyze + calculate_entry_exit for the backtester.
+    Takes trend codes instead of labels and returns (signal_code, sl, tp);
+    sl/tp are 0.0 on HOLD. Keep the rules in step with the class above.
+    Truthiness checks (`if ema_200:`) are written as != 0 so NaN stays truthy.
+    """
+    score = 0
+
+    # 1. Trend Analysis
+    if trend_dir == TREND_BULLISH:
+        score += 15
+        if ema_50 != 0 and close > ema_50:
+            score += 10
+    elif trend_dir == TREND_BEARISH:
+        score -= 15
+        if ema_50 != 0 and close < ema_50:
+            score -= 10
+
+    # MARKET REGIME FILTER (Higher Timeframe Bias)
+    is_bull_regime = False
+    is_bear_regime = False
+    if ema_200 != 0:
+        if close > ema_200: is_bull_regime = True
+        else: is_bear_regime = True
+
+    if trend_str == STRENGTH_WEAK:
+        # --- NO TRADE ZONE (Sideways Market) ---
+        score = 0
+    else:
+        # --- TREND FOLLOWING STRATEGY ---
+        if is_bull_regime:
+            if score > 0: score += 15
+            elif score < 0: score = 0
+        elif is_bear_regime:
+            if score < 0: score -= 15
+            elif score > 0: score = 0
+
+        if trend_str == STRENGTH_STRONG or trend_str == STRENGTH_VERY_STRONG:
+            if score > 0: score += 10
+            elif score < 0: score -= 10
+
+        # 2. Momentum Analysis - RSI (Trend Following Mode)
+        if is_bull_regime:
+            if rsi < 40:
+                score += 20
+            elif rsi > 70:
+                if trend_str == STRENGTH_VERY_STRONG:
+                    score += 5
+                else:
+                    score -= 10
+            elif rsi > 50:
+                score += 10
+        elif is_bear_regime:
+            if rsi > 60:
+                score -= 20
+            elif rsi < 30:
+                if trend_str == STRENGTH_VERY_STRONG:
+                    score -= 5
+                else:
+                    score += 10
+            elif rsi < 50:
+                score -= 10
+
+    # 3. MACD Analysis
+    if macd_hist > 0:
+        score += 10
+    else:
+        score -= 10
+
+    # 4. Price Action vs Support/Resistance
+    if support != 0 and close <= support * 1.01:
+        score += 15
+    if resistance != 0 and close >= resistance * 0.99:
+        score -= 15
+
+    # 5. Volume/Sentiment Analysis
+    if volume != 0 and vol_sma > 0:
+        vol_ratio = volume / vol_sma
+        if vol_ratio > 2.0:
+            if score > 0: score += 20
+            elif score < 0: score -= 20
+        elif vol_ratio > 1.2:
+            if score > 0: score += 10
+            elif score < 0: score -= 10
+        elif vol_ratio < 0.6:
+            if score > 0: score -= 5
+            elif score < 0: score += 5
+
+    final_probability = max(0, min(100, 50 + score))
+    if final_probability >= 75:
+        signal = SIGNAL_BUY
+    elif final_probability <= 25:
+        signal = SIGNAL_SELL
+    else:
+        return SIGNAL_HOLD, 0.0, 0.0
+
+    # Entry/exit multipliers (calculate_entry_exit)
+    sl_mult = 1.8
+    tp_mult = 3.0
+    if trend_str == STRENGTH_STRONG or trend_str == STRENGTH_VERY_STRONG:
+        tp_mult = 4.0
+        sl_mult = 2.0
+    elif trend_str == STRENGTH_WEAK:
+        tp_mult = 2.0
+        sl_mult = 1.5
+
+    if signal == SIGNAL_BUY:
+        return signal, close - (sl_mult * atr), close + (tp_mult * atr)
+    return signal, close + (sl_mult * atr), close - (tp_mult * atr)
@@ -1,82 +1,661 @@
+import hashlib
+import math
+import os
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
+from src.jit import njit
+
+# Kernels below reproduce pandas_ta's ema/rsi/atr/adx/macd/sma/obv (non-talib path)
+# bit for bit, working on raw float64 arrays instead of Series.
+
+@njit(cache=True)
+def ewm_mean(x, alpha):
+    """
+    Same recursion as pandas' ewm(adjust=False).mean(): NaNs are carried
+    over, and the weight still decays across them.
+    """
+    n = len(x)
+    out = np.empty(n)
+    old_wt_factor = 1.0 - alpha
+    old_wt = 1.0
+    weighted = np.nan
+    nobs = 0
+    for i in range(n):
+        cur = x[i]
+        is_obs = cur == cur
+        if i == 0:
+            weighted = cur
+        elif weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        if is_obs:
+            nobs += 1
+        out[i] = weighted if nobs > 0 else np.nan
+    return out
+
+@njit(cache=True)
+def rolling_sma(x, length):
+    out = np.full(len(x), np.nan)
+    out[length - 1:] = np.convolve(np.ones(length) / length, x)[length - 1:1 - length]
+    return out
+
+@njit(cache=True)
+def rolling_extreme(x, length, is_min):
+    """
+    Same as rolling(length).min() (or .max()) in O(n): a monotonic queue of
+    indices keeps the extreme of the window at its head. Windows holding a
+    NaN are NaN.
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    queue = np.empty(n, np.int64)
+    head = 0
+    tail = 0
+    last_nan = -length
+    for i in range(n):
+        value = x[i]
+        if value != value:
+            last_nan = i
+        elif is_min:
+            while tail > head and x[queue[tail - 1]] >= value:
+                tail -= 1
+            queue[tail] = i
+            tail += 1
+        else:
+            while tail > head and x[queue[tail - 1]] <= value:
+                tail -= 1
+            queue[tail] = i
+            tail += 1
+        while tail > head and queue[head] <= i - length:
+            head += 1
+        if i >= length - 1 and i - last_nan >= length:
+            out[i] = x[queue[head]]
+    return out
+
+@njit(cache=True)
+def on_balance_volume(close, volume):
+    n = len(close)
+    out = np.empty(n)
+    out[0] = np.nan
+    total = 0.0
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        if diff > 0:
+            signed = volume[i]
+        elif diff < 0:
+            signed = -volume[i]
+        else:
+            # flat (0) or missing (NaN) price change
+            signed = diff * volume[i]
+        if signed == signed:
+            total += signed
+            out[i] = total
+        else:
+            out[i] = np.nan
+    return out
+
+EPSILON = np.finfo(float).eps
+
+def _span_alpha(length):
+    # pandas turns span/alpha into a center of mass and back
+    return 1.0 / (1.0 + (length - 1) / 2)
+
+def _wilder_alpha(length):
+    alpha = 1.0 / length
+    return 1.0 / (1.0 + (1 - alpha) / alpha)
+
+def _seed_mean(x, length):
+    # Left to pandas so the seed sums in the same order as pandas_ta's
+    return pd.Series(x[:length]).mean()
+
+def _shift(x):
+    shifted = np.empty(len(x))
+    shifted[0] = np.nan
+    shifted[1:] = x[:-1]
+    return shifted
+
+def ema(close, length):
+    if len(close) < length:
+        return None
+    x = close.copy()
+    x[length - 1] = _seed_mean(close, length)
+    x[:length - 1] = np.nan
+    return ewm_mean(x, _span_alpha(length))
+
+def _rsi_averages(close, length):
+    alpha = _wilder_alpha(length)
+    diff = close - _shift(close)
+    positive_avg = ewm_mean(np.where(diff < 0, 0.0, diff), alpha)
+    negative_avg = ewm_mean(np.where(diff > 0, 0.0, diff), alpha)
+    return positive_avg, negative_avg
+
+def rsi(close, length=14):
+    if len(close) < length + 1:
+        return None
+    positive_avg, negative_avg = _rsi_averages(close, length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+def atr(high, low, close, length=14, prenan=False):
+    if len(close) < length + 1:
+        return None
+    hl_range = high - low
+    if (hl_range == 0).any():
+        hl_range += EPSILON
+    prev_close = _shift(close)
+    tr = np.fmax(np.fmax(np.abs(hl_range), np.abs(high - prev_close)), np.abs(prev_close - low))
+    if prenan:
+        tr[0] = np.nan
+    if np.isnan(tr).all():
+        return None
+    tr[length - 1] = _seed_mean(tr, length)
+    tr[:length - 1] = np.nan
+    result = ewm_mean(tr, _wilder_alpha(length))
+    if np.isnan(result).all():
+        return None
+    return result
+
+def _directional_moves(high, low):
+    up = high - _shift(high)
+    dn = _shift(low) - low
+    # 0 * move rather than 0 so a missing move stays NaN, as in pandas_ta
+    pos = np.where((up > dn) & (up > 0), up, 0.0 * up)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0 * dn)
+    pos[np.abs(pos) < EPSILON] = 0.0
+    neg[np.abs(neg) < EPSILON] = 0.0
+    return pos, neg
+
+def _adx_parts(high, low, close, length):
+    """
+    Returns the ATR, smoothed +DM/-DM and ADX arrays behind adx(), or None.
+    """
+    atr_ = atr(high, low, close, length, prenan=True)
+    if atr_ is None:
+        return None
+    alpha = _wilder_alpha(length)
+    pos, neg = _directional_moves(high, low)
+    pos_avg = ewm_mean(pos, alpha)
+    neg_avg = ewm_mean(neg, alpha)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 / atr_
+        dmp = k * pos_avg
+        dmn = k * neg_avg
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return atr_, pos_avg, neg_avg, ewm_mean(dx, alpha)
+
+def adx(high, low, close, length=14):
+    """
+    Returns (ADX, ADXR, DMP, DMN) like ta.adx, or None if there is too little data.
+    """
+    parts = _adx_parts(high, low, close, length)
+    if parts is None:
+        return None
+    atr_, pos_avg, neg_avg, adx_ = parts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 / atr_
+        adxr = 0.5 * (adx_ + _shift(_shift(adx_)))
+        return adx_, adxr, k * pos_avg, k * neg_avg
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Returns (MACD, histogram, signal) like ta.macd, or None if there is too little data.
+    """
+    if len(close) < slow + signal - 1:
+        return None
+    macd_line = ema(close, fast) - ema(close, slow)
+    # The signal EMA starts at the first valid MACD value
+    first = np.flatnonzero(macd_line == macd_line)[0]
+    signal_line = np.full(len(close), np.nan)
+    signal_line[first:] = ema(macd_line[first:], signal)
+    return macd_line, macd_line - signal_line, signal_line
+
+def sma(x, length):
+    if len(x) < length:
+        return None
+    return rolling_sma(x, length)
+
+def obv(close, volume):
+    if len(close) < 1:
+        return None
+    return on_balance_volume(close, volume)
+
+# Smoothing factor of each series carried by TechnicalAnalyzer.update()
+STREAM_ALPHAS = {
+    'EMA_50': _span_alpha(50),
+    'EMA_200': _span_alpha(200),
+    'EMA_12': _span_alpha(12),
+    'EMA_26': _span_alpha(26),
+    'MACDs': _span_alpha(9),
+    'RSI_pos': _wilder_alpha(14),
+    'RSI_neg': _wilder_alpha(14),
+    'ATR': _wilder_alpha(14),
+    'ADX_atr': _wilder_alpha(14),
+    'DM_pos': _wilder_alpha(14),
+    'DM_neg': _wilder_alpha(14),
+    'ADX': _wilder_alpha(14),
+}
+STREAM_WARMUP = 200
+SR_WINDOW = 20
+
+# Layout of the float64 state array advanced by _update_state: first a
+# (value, weight) pair per smoother, in STREAM_ALPHAS order
+_ALPHAS = np.array(list(STREAM_ALPHAS.values()))
+_S_PREV = 2 * len(STREAM_ALPHAS)        # previous high, low, close
+_S_HL_ZERO = _S_PREV + 3                # 1.0 once any candle had high == low
+_S_OBV = _S_HL_ZERO + 1
+_S_ADX_HIST = _S_OBV + 1                # ADX two bars back, then one bar back
+_S_VOLUMES = _S_ADX_HIST + 2            # last SR_WINDOW + 1 volumes, oldest first
+_S_LOWS = _S_VOLUMES + SR_WINDOW + 1    # last SR_WINDOW lows, oldest first
+_S_HIGHS = _S_LOWS + SR_WINDOW          # last SR_WINDOW highs, oldest first
+STATE_SIZE = _S_HIGHS + SR_WINDOW
+
+# Indicators returned by _update_state, in order
+STREAM_COLUMNS = (
+    'EMA_50', 'EMA_200', 'ADX_14', 'ADXR_14_2', 'DMP_14', 'DMN_14', 'RSI',
+    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 'ATR',
+    'VOL_SMA_20', 'OBV', 'Support_Dynamic', 'Resistance_Dynamic',
+)
+
+@njit(cache=True)
+def _ewm_step(state, alphas, i, cur):
+    """
+    One step of ewm_mean for the i-th smoother of a stream state.
+    """
+    weighted = state[2 * i]
+    if weighted != weighted:
+        state[2 * i] = cur
+        return cur
+    alpha = alphas[i]
+    old_wt = state[2 * i + 1] * (1.0 - alpha)
+    if cur == cur:
+        if weighted != cur:
+            weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+        old_wt = 1.0
+    state[2 * i] = weighted
+    state[2 * i + 1] = old_wt
+    return weighted
+
+@njit(cache=True)
+def _divide(a, b):
+    # Float division giving inf/NaN on a zero divisor, like the array math
+    if b == 0:
+        if a == 0 or a != a:
+            return np.nan
+        return np.inf if (a > 0) == (math.copysign(1.0, b) > 0) else -np.inf
+    return a / b
+
+@njit(cache=True)
+def _nanmax3(a, b, c):
+    out = np.nan
+    for v in (a, b, c):
+        if v == v and (out != out or v > out):
+            out = v
+    return out
+
+@njit(cache=True)
+def _push_window(state, start, length, value):
+    # Drops the oldest value of state[start:start + length] and appends value
+    for i in range(start, start + length - 1):
+        state[i] = state[i + 1]
+    state[start + length - 1] = value
+
+@njit(cache=True)
+def _window_extreme(state, start, length, is_min):
+    # Same as rolling(length).min()/max() on a full window: NaN if any value is
+    out = state[start]
+    for i in range(start, start + length):
+        v = state[i]
+        if v != v:
+            return np.nan
+        if (v < out) if is_min else (v > out):
+            out = v
+    return out
+
+@njit(cache=True)
+def _update_state(state, alphas, high, low, close, volume):
+    """
+    Advances a stream state by one candle, in place, and returns the
+    indicator values in STREAM_COLUMNS order.
+    """
+    prev_high = state[_S_PREV]
+    prev_low = state[_S_PREV + 1]
+    prev_close = state[_S_PREV + 2]
+
+    # Trend
+    ema_50 = _ewm_step(state, alphas, 0, close)
+    ema_200 = _ewm_step(state, alphas, 1, close)
+
+    # Momentum
+    macd_line = _ewm_step(state, alphas, 2, close) - _ewm_step(state, alphas, 3, close)
+    macd_signal = _ewm_step(state, alphas, 4, macd_line)
+    diff = close - prev_close
+    rsi_pos = _ewm_step(state, alphas, 5, 0.0 if diff < 0 else diff)
+    rsi_neg = _ewm_step(state, alphas, 6, 0.0 if diff > 0 else diff)
+    rsi_ = _divide(100 * rsi_pos, rsi_pos + abs(rsi_neg))
+
+    # Volatility and ADX share the true range
+    if high - low == 0:
+        state[_S_HL_ZERO] = 1.0
+    hl_range = high - low + EPSILON if state[_S_HL_ZERO] else high - low
+    tr = _nanmax3(abs(hl_range), abs(high - prev_close), abs(prev_close - low))
+    atr_ = _ewm_step(state, alphas, 7, tr)
+
+    up = high - prev_high
+    dn = prev_low - low
+    pos = up if up > dn and up > 0 else 0.0 * up
+    neg = dn if dn > up and dn > 0 else 0.0 * dn
+    k = _divide(100.0, _ewm_step(state, alphas, 8, tr))
+    dmp = k * _ewm_step(state, alphas, 9, 0.0 if abs(pos) < EPSILON else pos)
+    dmn = k * _ewm_step(state, alphas, 10, 0.0 if abs(neg) < EPSILON else neg)
+    adx_ = _ewm_step(state, alphas, 11, _divide(100 * abs(dmp - dmn), dmp + dmn))
+    adxr = 0.5 * (adx_ + state[_S_ADX_HIST])
+    state[_S_ADX_HIST] = state[_S_ADX_HIST + 1]
+    state[_S_ADX_HIST + 1] = adx_
+
+    # Volume
+    if diff > 0:
+        signed = volume
+    elif diff < 0:
+        signed = -volume
+    else:
+        signed = diff * volume
+    if signed == signed:
+        state[_S_OBV] += signed
+        obv_ = state[_S_OBV]
+    else:
+        obv_ = np.nan
+    # The window keeps one extra volume so np.convolve sums in the same
+    # order as it does over the full history
+    _push_window(state, _S_VOLUMES, SR_WINDOW + 1, volume)
+    vol_sma = rolling_sma(state[_S_VOLUMES:_S_LOWS], SR_WINDOW)[-1]
+
+    # Support & Resistance
+    _push_window(state, _S_LOWS, SR_WINDOW, low)
+    _push_window(state, _S_HIGHS, SR_WINDOW, high)
+    support = _window_extreme(state, _S_LOWS, SR_WINDOW, True)
+    resistance = _window_extreme(state, _S_HIGHS, SR_WINDOW, False)
+
+    state[_S_PREV] = high
+    state[_S_PREV + 1] = low
+    state[_S_PREV + 2] = close
+    return np.array((
+        ema_50, ema_200, adx_, adxr, dmp, dmn, rsi_,
+        macd_line, macd_line - macd_signal, macd_signal, atr_,
+        vol_sma, obv_, support, resistance,
+    ))
+
+# Columns read by get_latest_metrics, in the order they are unpacked
+METRIC_COLUMNS = (
+    'close', 'volume', 'VOL_SMA_20', 'OBV', 'RSI',
+    'MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9',
+    'EMA_50', 'EMA_200', 'ATR', 'Support_Dynamic', 'Resistance_Dynamic', 'ADX_14',
+)
+
+# Default location for add_all_indicators(cache_dir=...). Bump the version
+# whenever the indicator output changes, so older files are not reused.
+INDICATOR_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'tradecrypto', 'ind')
+INDICATOR_CACHE_VERSION = b'1'
+
+def _indicator_cache_path(df, cache_dir):
+    # The indicators only depend on the candles, so their hash is the key
+    digest = hashlib.blake2b(INDICATOR_CACHE_VERSION, digest_size=16)
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+    return os.path.join(cache_dir, digest.hexdigest() + '.pkl')
+
+def _load_indicator_cache(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        cached = pd.read_pickle(path)
+        if isinstance(cached, pd.DataFrame):
+            return cached
+    except Exception:
+        # Corrupt, or written by another pandas/numpy version (which can fail
+        # with AttributeError, ImportError, TypeError, ...)
+        pass
+    # Unusable, so drop it; the caller recomputes and writes it again
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return None
+
+def _save_indicator_cache(path, df):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
 
 class TechnicalAnalyzer:
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=False):
+        # The analyzer never writes into the frame it is given (results go
+        # to a new one), so df is only copied if the caller asks to, e.g.
+        # when it will modify df in place while the analyzer is in use
+        self.df = df.copy() if copy else df
+        self._stream = None
+        self._latest_row = None
+        self._metric_columns = None
+
+    @classmethod
+    def from_ndarray(cls, ohlcv, timestamps=None):
+        """
+        Builds an analyzer directly from an (n, 5) float64 array of
+        open/high/low/close/volume. The array backs the frame without being
+        copied, so the caller must not modify it.
+        """
+        df = pd.DataFrame(ohlcv, columns=['open', 'high', 'low', 'close', 'volume'], copy=False)
+        if timestamps is not None:
+            df.insert(0, 'timestamp', timestamps)
+        return cls(df)
+
+    @classmethod
+    def from_arrays(cls, close, high, low, volume, open_=None, timestamps=None):
+        """
+        Builds an analyzer from separate float64 arrays, which back the
+        frame's columns without being copied, so the caller must not modify
+        them. Only the candle fields the indicators read are required.
+        """
+        columns = {}
+        if timestamps is not None:
+            columns['timestamp'] = timestamps
+        if open_ is not None:
+            columns['open'] = open_
+        columns.update({'high': high, 'low': low, 'close': close, 'volume': volume})
+        return cls(pd.DataFrame(columns, copy=False))
+
+    def _ohlcv_arrays(self):
+        return tuple(self.df[c].to_numpy(dtype=float) for c in ('high', 'low', 'close', 'volume'))
 
-    def add_all_indicators(self):
+    def add_all_indicators(self, cache_dir=None):
         """
         Calculates all necessary indicators for the strategy.
+        With cache_dir (e.g. INDICATOR_CACHE_DIR) the result is stored there
+        and loaded back instead of recomputed when the same candles come
+        again, as when a backtest is replayed.
         """
+        # Everything but BBands runs on the raw arrays through the kernels
+        # above. Every column is collected as an array first and joined to
+        # the candles in one go at the end.
+        # A fresh history restarts the streaming state on the next update()
+        self._stream = None
+        self._latest_row = None
+        if cache_dir:
+            cache_path = _indicator_cache_path(self.df, cache_dir)
+            cached = _load_indicator_cache(cache_path)
+            if cached is not None:
+                self.df = cached
+                return self.df
+
+        high, low, close, volume = self._ohlcv_arrays()
+        results = {}
+
         # Trend Indicators
-        self.df['EMA_50'] = ta.ema(self.df['close'], length=50)
-        self.df['EMA_200'] = ta.ema(self.df['close'], length=200)
+        results['EMA_50'] = ema(close, 50)
+        results['EMA_200'] = ema(close, 200)
         
-        adx = ta.adx(self.df['high'], self.df['low'], self.df['close'])
-        self.df = pd.concat([self.df, adx], axis=1) # ADX_14, DMP_14, DMN_14
+        adx_cols = adx(high, low, close, 14)
+        if adx_cols is not None:
+            results.update(zip(('ADX_14', 'ADXR_14_2', 'DMP_14', 'DMN_14'), adx_cols))
 
         # Momentum Indicators
-        self.df['RSI'] = ta.rsi(self.df['close'], length=14)
-        macd = ta.macd(self.df['close'])
-        self.df = pd.concat([self.df, macd], axis=1) # MACD_12_26_9, MACDh_12_26_9, MACDs_12_26_9
+        results['RSI'] = rsi(close, 14)
+        macd_cols = macd(close)
+        if macd_cols is not None:
+            results.update(zip(('MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9'), macd_cols))
 
         # Volatility Indicators
-        self.df['ATR'] = ta.atr(self.df['high'], self.df['low'], self.df['close'], length=14)
+        results['ATR'] = atr(high, low, close, 14)
         bb = ta.bbands(self.df['close'], length=20, std=2)
-        self.df = pd.concat([self.df, bb], axis=1)
+        if bb is not None:
+            results.update(zip(bb.columns, bb.to_numpy().T))
 
         # Volume Indicators
-        self.df['VOL_SMA_20'] = ta.sma(self.df['volume'], length=20)
-        self.df['OBV'] = ta.obv(self.df['close'], self.df['volume'])
+        results['VOL_SMA_20'] = sma(volume, 20)
+        results['OBV'] = obv(close, volume)
 
         # Support & Resistance (Dynamic - Local Min/Max over last 20 periods)
         # Using a rolling window to find local min/max which act as S/R
-        self.df['Support_Dynamic'] = self.df['low'].rolling(window=20).min()
-        self.df['Resistance_Dynamic'] = self.df['high'].rolling(window=20).max()
+        results['Support_Dynamic'] = rolling_extreme(low, SR_WINDOW, True)
+        results['Resistance_Dynamic'] = rolling_extreme(high, SR_WINDOW, False)
 
+        # The indicators form a single float block joined by one concat;
+        # assign() would add (and copy in) each column as its own block.
+        # Columns from an earlier run are dropped so they get replaced.
+        indicators = pd.DataFrame(results, index=self.df.index)
+        stale = self.df.columns.intersection(indicators.columns)
+        candles = self.df.drop(columns=stale) if len(stale) else self.df
+        self.df = pd.concat([candles, indicators], axis=1)
+        if cache_dir:
+            _save_indicator_cache(cache_path, self.df)
         return self.df
 
+    def _seed_stream(self):
+        """
+        Builds the state update() advances from the current history.
+        Returns False while there are too few candles to warm up EMA_200.
+        """
+        high, low, close, volume = self._ohlcv_arrays()
+        n = len(close)
+        if n < STREAM_WARMUP:
+            return False
+
+        rsi_pos, rsi_neg = _rsi_averages(close, 14)
+        adx_atr, dm_pos, dm_neg, adx_ = _adx_parts(high, low, close, 14)
+        series = {
+            'EMA_50': ema(close, 50),
+            'EMA_200': ema(close, 200),
+            'EMA_12': ema(close, 12),
+            'EMA_26': ema(close, 26),
+            'MACDs': macd(close)[2],
+            'RSI_pos': rsi_pos,
+            'RSI_neg': rsi_neg,
+            'ATR': atr(high, low, close, 14),
+            'ADX_atr': adx_atr,
+            'DM_pos': dm_pos,
+            'DM_neg': dm_neg,
+            'ADX': adx_,
+        }
+        obv_ = obv(close, volume)
+        obv_ = obv_[obv_ == obv_]
+
+        state = np.empty(STATE_SIZE)
+        # [value, weight] per smoother; the weight is back to 1 after an
+        # observed value, which the last candle is assumed to be
+        for i, name in enumerate(STREAM_ALPHAS):
+            state[2 * i] = series[name][-1]
+            state[2 * i + 1] = 1.0
+        state[_S_PREV:_S_HL_ZERO] = (high[-1], low[-1], close[-1])
+        state[_S_HL_ZERO] = (high - low == 0).any()
+        state[_S_OBV] = obv_[-1] if len(obv_) else 0.0
+        state[_S_ADX_HIST:_S_VOLUMES] = adx_[-2:]
+        state[_S_VOLUMES:_S_LOWS] = volume[-SR_WINDOW - 1:]
+        state[_S_LOWS:_S_HIGHS] = low[-SR_WINDOW:]
+        state[_S_HIGHS:] = high[-SR_WINDOW:]
+        self._stream = state
+        return True
+
+    def update(self, new_candle):
+        """
+        Advances the indicators by one closed candle (a dict or row with
+        open/high/low/close/volume) in constant time and returns the metrics
+        for it, as get_latest_metrics() does from then on.
+        The running state is seeded from the history on the first call and
+        self.df is left as is. Until there are enough candles to seed it,
+        the candle is appended and all indicators are recomputed instead.
+        """
+        if self._stream is None and not self._seed_stream():
+            self.df = pd.concat([self.df, pd.DataFrame([new_candle])], ignore_index=True)
+            self.add_all_indicators()
+            return self.get_latest_metrics()
+
+        high, low, close, volume = (float(new_candle[c]) for c in ('high', 'low', 'close', 'volume'))
+        values = _update_state(self._stream, _ALPHAS, high, low, close, volume)
+
+        row = {c: new_candle[c] for c in ('timestamp', 'open') if c in new_candle}
+        row.update({'high': high, 'low': low, 'close': close, 'volume': volume})
+        row.update(zip(STREAM_COLUMNS, values.tolist()))
+        self._latest_row = row
+        return self.get_latest_metrics()
+
+    def _last_row_values(self):
+        columns = self.df.columns
+        if self._metric_columns is not columns:
+            # ADX_14 is missing when there are too few candles
+            self._metric_positions = [columns.get_loc(c) for c in METRIC_COLUMNS[:-1]]
+            self._metric_positions.append(columns.get_loc('ADX_14') if 'ADX_14' in columns else None)
+            self._metric_columns = columns
+        # One row sliced out as an array, instead of a Series indexed by name
+        row = self.df.iloc[-1:].to_numpy()[0]
+        return [row[p] if p is not None else None for p in self._metric_positions]
+
     def get_latest_metrics(self):
         """
         Returns the indicators for the latest candle.
         """
-        latest = self.df.iloc[-1]
-        
-        # Check if EMA_200 exists (might be NaN if not enough data)
+        latest = self._latest_row
+        if latest is not None:
+            values = [latest[c] for c in METRIC_COLUMNS[:-1]]
+            values.append(latest.get('ADX_14'))
+        else:
+            values = self._last_row_values()
+        (close, volume, vol_sma, obv_, rsi_, macd_line, macd_signal, macd_hist,
+         ema_50, ema_200, atr_, support, resistance, adx_) = values
+
+        # EMA_200 is None with fewer than 200 candles; x == x is False for NaN
         trend_direction = "Sideways"
-        if pd.notna(latest['EMA_50']) and pd.notna(latest['EMA_200']):
-            if latest['EMA_50'] > latest['EMA_200']:
-                trend_direction = "Bullish"
-            else:
-                trend_direction = "Bearish"
+        if ema_200 is not None and ema_50 == ema_50 and ema_200 == ema_200:
+            trend_direction = "Bullish" if ema_50 > ema_200 else "Bearish"
 
         # Determine Trend Strength based on ADX
         # ADX > 25 indicates a strong trend
-        adx_col = 'ADX_14'
         trend_strength = "Weak"
-        if pd.notna(latest.get(adx_col)):
-            if latest[adx_col] > 50:
-                trend_strength = "Very Strong"
-            elif latest[adx_col] > 25:
-                trend_strength = "Strong"
-            elif latest[adx_col] > 20:
-                trend_strength = "Medium"
+        if adx_ is not None and adx_ == adx_:
+            trend_strength = "Very Strong" if adx_ > 50 else "Strong" if adx_ > 25 else "Medium" if adx_ > 20 else "Weak"
         
         return {
-            'close': latest['close'],
-            'volume': latest['volume'],
-            'vol_sma': latest['VOL_SMA_20'],
-            'obv': latest['OBV'],
-            'rsi': latest['RSI'],
-            'macd': latest['MACD_12_26_9'],
-            'macd_signal': latest['MACDs_12_26_9'],
-            'macd_hist': latest['MACDh_12_26_9'],
-            'ema_50': latest['EMA_50'],
-            'ema_200': latest['EMA_200'],
-            'atr': latest['ATR'],
+            'close': close,
+            'volume': volume,
+            'vol_sma': vol_sma,
+            'obv': obv_,
+            'rsi': rsi_,
+            'macd': macd_line,
+            'macd_signal': macd_signal,
+            'macd_hist': macd_hist,
+            'ema_50': ema_50,
+            'ema_200': ema_200,
+            'atr': atr_,
             'trend_direction': trend_direction,
             'trend_strength': trend_strength,
-            'support': latest['Support_Dynamic'],
-            'resistance': latest['Resistance_Dynamic']
+            'support': support,
+            'resistance': resistance
         }